@@ -4,7 +4,12 @@ Review Item Processor with MCP integration
 This module provides document review capabilities with MCP tools for external verification.
 """
 
-from agent import process_review
+from agent import (
+    process_review,
+    process_review_async,
+    process_review_batch,
+    process_review_batch_async,
+)
 from lambda_handler import handler
 from utils import (
     ensure_result_fields,
@@ -15,6 +20,9 @@ from utils import (
 
 __all__ = [
     "process_review",
+    "process_review_batch",
+    "process_review_async",
+    "process_review_batch_async",
     "handler",
     "get_language_name",
     "format_prompt",
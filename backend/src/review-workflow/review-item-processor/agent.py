@@ -1,20 +1,40 @@
+import asyncio
 import hashlib
-import itertools
 import json
 import logging
 import os
 import re
+import shutil
 import tempfile
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
 from contextlib import ExitStack
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional, Tuple
 
-import boto3
+from bedrock_scheduler import ScheduledModel, bedrock_scheduler
+from boto3.s3.transfer import TransferConfig
+from clients import get_boto3_client, get_bedrock_model
+from document_cache import DocumentCache
+from document_reader import needs_paged_reading, read_document
+from document_text import DocumentTextStore, render_pages, supports_extraction
+from image_dedupe import IMAGE_DEDUPE_ENABLED, dedupe_images
+from image_normalizer import (
+    IMAGE_NORMALIZATION_ENABLED,
+    normalize_images,
+    remap_image_indexes,
+)
 from lambda_function_client import LambdaFunctionParameters, lambda_function_client
+from mcp_tools import LazyMCPAgentTool, LazyMCPServer, tool_catalog_cache
+from page_index import PAGE_RETRIEVAL_ENABLED, PageIndex, get_page_index
 from strands import Agent
-from strands.models import BedrockModel
+from strands.agent.conversation_manager import (
+    NullConversationManager,
+    SlidingWindowConversationManager,
+)
 from strands.tools.mcp import MCPClient
+from strands.types.exceptions import ContextWindowOverflowException
 from strands_tools import file_read, image_reader
 
 logger = logging.getLogger(__name__)
@@ -22,9 +42,134 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 
+# Bedrock on-demand prices in USD per 1k tokens, keyed by base model ID (without
+# the cross-region prefix). cache_write_per_1k is 0 for models that do not
+# charge for cache writes.
+DEFAULT_MODEL_PRICING: Dict[str, Dict[str, float]] = {
+    "anthropic.claude-3-5-sonnet-20241022-v2:0": {
+        "input_per_1k": 0.003,
+        "output_per_1k": 0.015,
+        "cache_read_per_1k": 0.0003,
+        "cache_write_per_1k": 0.00375,
+    },
+    "anthropic.claude-3-5-sonnet-20240620-v1:0": {
+        "input_per_1k": 0.003,
+        "output_per_1k": 0.015,
+        "cache_read_per_1k": 0.0003,
+        "cache_write_per_1k": 0.00375,
+    },
+    "anthropic.claude-3-5-haiku-20241022-v1:0": {
+        "input_per_1k": 0.0008,
+        "output_per_1k": 0.004,
+        "cache_read_per_1k": 0.00008,
+        "cache_write_per_1k": 0.001,
+    },
+    "anthropic.claude-3-opus-20240229-v1:0": {
+        "input_per_1k": 0.015,
+        "output_per_1k": 0.075,
+        "cache_read_per_1k": 0.0015,
+        "cache_write_per_1k": 0.01875,
+    },
+    "anthropic.claude-3-sonnet-20240229-v1:0": {
+        "input_per_1k": 0.003,
+        "output_per_1k": 0.015,
+        "cache_read_per_1k": 0.0003,
+        "cache_write_per_1k": 0.00375,
+    },
+    "anthropic.claude-3-haiku-20240307-v1:0": {
+        "input_per_1k": 0.00025,
+        "output_per_1k": 0.00125,
+        "cache_read_per_1k": 0.00003,
+        "cache_write_per_1k": 0.0003,
+    },
+    "anthropic.claude-sonnet-4-20250514-v1:0": {
+        "input_per_1k": 0.003,
+        "output_per_1k": 0.015,
+        "cache_read_per_1k": 0.0003,
+        "cache_write_per_1k": 0.00375,
+    },
+    "anthropic.claude-opus-4-20250514-v1:0": {
+        "input_per_1k": 0.015,
+        "output_per_1k": 0.075,
+        "cache_read_per_1k": 0.0015,
+        "cache_write_per_1k": 0.01875,
+    },
+    "anthropic.claude-3-7-sonnet-20250219-v1:0": {
+        "input_per_1k": 0.003,
+        "output_per_1k": 0.015,
+        "cache_read_per_1k": 0.0003,
+        "cache_write_per_1k": 0.00375,
+    },
+    "amazon.nova-premier-v1:0": {
+        "input_per_1k": 0.0025,
+        "output_per_1k": 0.0125,
+        "cache_read_per_1k": 0.000625,
+        "cache_write_per_1k": 0.0,
+    },
+    "amazon.nova-pro-v1:0": {
+        "input_per_1k": 0.0008,
+        "output_per_1k": 0.0032,
+        "cache_read_per_1k": 0.0002,
+        "cache_write_per_1k": 0.0,
+    },
+    "amazon.nova-lite-v1:0": {
+        "input_per_1k": 0.00006,
+        "output_per_1k": 0.00024,
+        "cache_read_per_1k": 0.000015,
+        "cache_write_per_1k": 0.0,
+    },
+    "amazon.nova-micro-v1:0": {
+        "input_per_1k": 0.000035,
+        "output_per_1k": 0.00014,
+        "cache_read_per_1k": 0.00000875,
+        "cache_write_per_1k": 0.0,
+    },
+}
+# Optional JSON file with prices in the same format; entries override the defaults
+MODEL_PRICING_FILE = os.environ.get("MODEL_PRICING_FILE", "")
+
+
+def base_model_id(model_id: str) -> str:
+    """
+    Strip the cross-region inference prefix from a model ID.
+
+    e.g. "us.anthropic.claude-3-7-sonnet-20250219-v1:0"
+      → "anthropic.claude-3-7-sonnet-20250219-v1:0"
+    """
+    match = re.match(r"^[a-z]+\.(?=[a-z]+\.)", model_id)
+    return model_id[match.end() :] if match else model_id
+
+
+def load_model_pricing(path: str = MODEL_PRICING_FILE) -> Dict[str, Dict[str, float]]:
+    """
+    Load the pricing table, merging the optional pricing file over the defaults.
+
+    Args:
+        path: JSON file of {model ID: {input_per_1k, output_per_1k,
+            cache_read_per_1k, cache_write_per_1k}}; model IDs may carry a
+            region prefix
+
+    Returns:
+        Pricing table keyed by base model ID
+    """
+    pricing = {model: dict(prices) for model, prices in DEFAULT_MODEL_PRICING.items()}
+    if path:
+        try:
+            with open(path, encoding="utf-8") as f:
+                overrides = json.load(f)
+            for model, prices in overrides.items():
+                pricing.setdefault(base_model_id(model), {}).update(prices)
+            logger.info(f"Loaded model pricing for {len(overrides)} models from {path}")
+        except Exception as e:
+            logger.warning(f"Failed to load model pricing from {path}: {e}")
+    return pricing
+
+
 class ReviewMetaTracker:
     """Class to track review metadata such as pricing and execution time."""
 
+    _pricing_table: Optional[Dict[str, Dict[str, float]]] = None
+
     def __init__(self, model_id: str):
         self.model_id = model_id
         self.pricing = self._get_model_pricing(model_id)
@@ -32,20 +177,38 @@ class ReviewMetaTracker:
 
     def _get_model_pricing(self, model_id: str) -> Dict[str, float]:
         """Get pricing information for the specified model ID."""
-        pricing_table = {
-            "us.anthropic.claude-3-7-sonnet-20250219-v1:0": {
-                "input_per_1k": 0.003,
-                "output_per_1k": 0.015,
-            },
-            "us.amazon.nova-premier-v1:0": {
-                "input_per_1k": 0.0025,
-                "output_per_1k": 0.0125,
-            },
+        if ReviewMetaTracker._pricing_table is None:
+            ReviewMetaTracker._pricing_table = load_model_pricing()
+        prices = ReviewMetaTracker._pricing_table.get(base_model_id(model_id), {})
+        if not prices:
+            logger.warning(f"No pricing information for model {model_id}")
+        return {
+            "input_per_1k": prices.get("input_per_1k", 0),
+            "output_per_1k": prices.get("output_per_1k", 0),
+            # Without a cache price, cached tokens are priced as regular input
+            "cache_read_per_1k": prices.get(
+                "cache_read_per_1k", prices.get("input_per_1k", 0)
+            ),
+            "cache_write_per_1k": prices.get(
+                "cache_write_per_1k", prices.get("input_per_1k", 0)
+            ),
         }
-        return pricing_table.get(model_id, {"input_per_1k": 0, "output_per_1k": 0})
 
-    def get_review_meta(self, agent_result) -> Dict[str, Any]:
-        """Extract review metadata from the agent result."""
+    def get_review_meta(
+        self, agent_result, model_usage: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Extract review metadata from the agent result.
+
+        Args:
+            agent_result: Result of the agent invocation
+            model_usage: Usage reported by Bedrock, including the prompt cache
+                counters that strands does not accumulate (ScheduledModel.usage)
+
+        Returns:
+            Token counts, costs (with prompt cache reads and writes priced
+            separately) and timing of the review
+        """
         end_time = time.time()
         duration = end_time - self.start_time
 
@@ -54,22 +217,51 @@ class ReviewMetaTracker:
         input_tokens = usage.get("inputTokens", 0)
         output_tokens = usage.get("outputTokens", 0)
         total_tokens = usage.get("totalTokens", 0)
+        model_usage = model_usage or {}
+        cache_read_tokens = model_usage.get("cacheReadInputTokens", 0)
+        cache_write_tokens = model_usage.get("cacheWriteInputTokens", 0)
 
         logging.debug(
-            f"Token usage from metrics: input={input_tokens}, output={output_tokens}, total={total_tokens}"
+            f"Token usage from metrics: input={input_tokens}, output={output_tokens}, total={total_tokens}, "
+            f"cache_read={cache_read_tokens}, cache_write={cache_write_tokens}"
         )
 
+        # inputTokens only counts the uncached part of the input
         input_cost = (input_tokens / 1000) * self.pricing["input_per_1k"]
         output_cost = (output_tokens / 1000) * self.pricing["output_per_1k"]
-        total_cost = input_cost + output_cost
+        cache_read_cost = (cache_read_tokens / 1000) * self.pricing["cache_read_per_1k"]
+        cache_write_cost = (
+            cache_write_tokens / 1000
+        ) * self.pricing["cache_write_per_1k"]
+        total_cost = input_cost + output_cost + cache_read_cost + cache_write_cost
+
+        # What the same review would have cost without prompt caching
+        all_input_tokens = input_tokens + cache_read_tokens + cache_write_tokens
+        cost_without_cache = (
+            all_input_tokens / 1000
+        ) * self.pricing["input_per_1k"] + output_cost
 
         return {
             "model_id": self.model_id,
             "input_tokens": input_tokens,
             "output_tokens": output_tokens,
+            "cache_read_input_tokens": cache_read_tokens,
+            "cache_write_input_tokens": cache_write_tokens,
             "input_cost": input_cost,
             "output_cost": output_cost,
+            "cache_read_cost": cache_read_cost,
+            "cache_write_cost": cache_write_cost,
             "total_cost": total_cost,
+            "cost_without_cache": cost_without_cache,
+            "cache_savings": cost_without_cache - total_cost,
+            # Cost per 1k input tokens actually processed (cached or not)
+            "effective_input_cost_per_1k": (
+                (input_cost + cache_read_cost + cache_write_cost)
+                / all_input_tokens
+                * 1000
+                if all_input_tokens
+                else 0
+            ),
             "pricing": self.pricing,
             "duration_seconds": round(duration, 2),
             "timestamp": datetime.now(timezone.utc).isoformat(),
@@ -119,8 +311,78 @@ NOVA_PREMIER_MODEL_ID = IMAGE_MODEL_ID
 # Get environment variables
 PY_MCP_LAMBDA_ARN = os.environ.get("PY_MCP_LAMBDA_ARN", "")
 NODE_MCP_LAMBDA_ARN = os.environ.get("NODE_MCP_LAMBDA_ARN", "")
+# Answer the MCP initialize handshake of the mcp-runtime functions locally
+# instead of spending an invocation on it
+MCP_LOCAL_INITIALIZE = os.environ.get("MCP_LOCAL_INITIALIZE", "true").lower() == "true"
 AWS_REGION = os.environ.get("AWS_REGION", "us-west-2")
 BEDROCK_REGION = os.environ.get("BEDROCK_REGION", "us-west-2")
+# Maximum number of check items reviewed concurrently in batch mode
+REVIEW_BATCH_MAX_WORKERS = int(os.environ.get("REVIEW_BATCH_MAX_WORKERS", "4"))
+
+# Time allowed for an MCP server to start and list its tools
+MCP_SERVER_STARTUP_TIMEOUT_SECONDS = float(
+    os.environ.get("MCP_SERVER_STARTUP_TIMEOUT_SECONDS", "20")
+)
+# Maximum number of documents downloaded from S3 concurrently
+S3_DOWNLOAD_MAX_WORKERS = int(os.environ.get("S3_DOWNLOAD_MAX_WORKERS", "8"))
+# Files above the threshold are fetched with ranged multipart GETs
+S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=int(
+        os.environ.get("S3_MULTIPART_THRESHOLD", str(8 * 1024 * 1024))
+    ),
+    multipart_chunksize=int(
+        os.environ.get("S3_MULTIPART_CHUNKSIZE", str(8 * 1024 * 1024))
+    ),
+    max_concurrency=int(os.environ.get("S3_MULTIPART_MAX_CONCURRENCY", "10")),
+)
+
+# Documents downloaded from S3 are kept under /tmp across warm invocations
+document_cache = DocumentCache()
+
+# Give the agent page-marked text extracted once per document version
+# instead of the binary file
+DOCUMENT_TEXT_EXTRACTION_ENABLED = (
+    os.environ.get("DOCUMENT_TEXT_EXTRACTION_ENABLED", "true").lower() == "true"
+)
+# Extracted text artifacts, shared by every review in the container
+document_text_store = DocumentTextStore()
+
+# Attach the documents as a cached message prefix shared by every check
+# (only for models that support prompt caching)
+DOCUMENT_PREFIX_CACHE_ENABLED = (
+    os.environ.get("DOCUMENT_PREFIX_CACHE_ENABLED", "true").lower() == "true"
+)
+# Bedrock Converse limits for attached documents and images
+BEDROCK_MAX_DOCUMENTS = 5
+BEDROCK_MAX_DOCUMENT_BYTES = int(4.5 * 1024 * 1024)
+BEDROCK_MAX_IMAGES = 20
+BEDROCK_MAX_IMAGE_BYTES = int(3.75 * 1024 * 1024)
+BEDROCK_DOCUMENT_FORMATS = {
+    ".pdf": "pdf",
+    ".csv": "csv",
+    ".doc": "doc",
+    ".docx": "docx",
+    ".xls": "xls",
+    ".xlsx": "xlsx",
+    ".html": "html",
+    ".txt": "txt",
+    ".md": "md",
+}
+BEDROCK_IMAGE_FORMATS = {
+    ".jpg": "jpeg",
+    ".jpeg": "jpeg",
+    ".png": "png",
+    ".gif": "gif",
+    ".webp": "webp",
+}
+# Messages of Bedrock ValidationExceptions caused by an oversized request
+# (context window, per-image and per-request attachment limits)
+REQUEST_SIZE_ERROR_MESSAGES = (
+    "input is too long for requested model",
+    "prompt is too long",
+    "image exceeds 5 mb maximum",
+    "a maximum of 100 pdf pages may be provided",
+)
 # Models that support prompt and tool caching
 # Base model IDs that support prompt and tool caching (without region prefixes)
 CACHE_SUPPORTED_BASE_MODELS = {
@@ -155,24 +417,7 @@ def supports_caching(model_id: str) -> bool:
     Returns:
         True if the model supports caching, False otherwise
     """
-    # First check if it's a direct model ID
-    if model_id in CACHE_SUPPORTED_BASE_MODELS:
-        return True
-
-    # Check if it's a cross-region inference profile
-    # Pattern: {region}.{model_id} where region is lowercase letters
-    import re
-
-    cross_region_pattern = re.compile(r"^[a-z]+\.")
-    match = cross_region_pattern.match(model_id)
-    if match:
-        # Extract the base model ID by removing the region prefix
-        prefix_end = match.end()
-        base_model_id = model_id[prefix_end:]
-        return base_model_id in CACHE_SUPPORTED_BASE_MODELS
-
-    # Model not supported
-    return False
+    return base_model_id(model_id) in CACHE_SUPPORTED_BASE_MODELS
 
 
 def create_mcp_client(mcp_server_cfg: Dict[str, Any]) -> MCPClient:
@@ -200,7 +445,14 @@ def create_mcp_client(mcp_server_cfg: Dict[str, Any]) -> MCPClient:
     return MCPClient(
         lambda: lambda_function_client(
             LambdaFunctionParameters(
-                function_name=fn_arn, region_name=AWS_REGION, mcp_server=mcp_server_cfg
+                function_name=fn_arn,
+                region_name=AWS_REGION,
+                mcp_server=mcp_server_cfg,
+                # Both MCP runtimes answer JSON-RPC batches and a static initialize
+                batch_messages=True,
+                local_initialize=MCP_LOCAL_INITIALIZE
+                and bool(fn_arn)
+                and fn_arn in (PY_MCP_LAMBDA_ARN, NODE_MCP_LAMBDA_ARN),
             )
         )
     )
@@ -232,6 +484,114 @@ def sanitize_file_name(filename: str) -> str:
     return sanitized
 
 
+def build_document_prefix(file_paths: List[str]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Build conversation messages that attach the documents with a cache point.
+
+    Every check of a review runs against the same files, so placing their
+    content in a fixed prefix (after tools and system prompt) lets all checks
+    after the first read it from the Bedrock prompt cache instead of having
+    the agent load it again.
+
+    Args:
+        file_paths: Local paths of the downloaded documents
+
+    Returns:
+        [user message with document/image blocks and a cache point, assistant
+        acknowledgement], or None if a file cannot be attached (unsupported
+        format or over the Bedrock size limits)
+    """
+    blocks: List[Dict[str, Any]] = []
+    documents = images = 0
+    for index, file_path in enumerate(file_paths):
+        ext = os.path.splitext(file_path)[1].lower()
+        size = os.path.getsize(file_path)
+        # Bedrock names may not contain underscores
+        name = os.path.splitext(os.path.basename(file_path))[0].replace("_", "-")
+        if ext in BEDROCK_DOCUMENT_FORMATS:
+            documents += 1
+            if documents > BEDROCK_MAX_DOCUMENTS or size > BEDROCK_MAX_DOCUMENT_BYTES:
+                logger.info(f"Document prefix disabled: {file_path} exceeds limits")
+                return None
+            with open(file_path, "rb") as f:
+                blocks.append(
+                    {
+                        "document": {
+                            "format": BEDROCK_DOCUMENT_FORMATS[ext],
+                            "name": name,
+                            "source": {"bytes": f.read()},
+                        }
+                    }
+                )
+        elif ext in BEDROCK_IMAGE_FORMATS:
+            images += 1
+            if images > BEDROCK_MAX_IMAGES or size > BEDROCK_MAX_IMAGE_BYTES:
+                logger.info(f"Document prefix disabled: {file_path} exceeds limits")
+                return None
+            with open(file_path, "rb") as f:
+                # Position in file_paths, which usedImageIndexes refers to
+                blocks.append({"text": f"Image {index}: {name}"})
+                blocks.append(
+                    {
+                        "image": {
+                            "format": BEDROCK_IMAGE_FORMATS[ext],
+                            "source": {"bytes": f.read()},
+                        }
+                    }
+                )
+        else:
+            logger.info(f"Document prefix disabled: unsupported format {ext}")
+            return None
+
+    if not blocks:
+        return None
+
+    blocks.append({"cachePoint": {"type": "default"}})
+    return [
+        {"role": "user", "content": blocks},
+        {
+            "role": "assistant",
+            "content": [
+                {"text": "I have received the documents and will review them."}
+            ],
+        },
+    ]
+
+
+def is_request_size_error(error: Exception) -> bool:
+    """
+    Whether a Bedrock error was caused by an oversized request.
+
+    Follows the exception chain, because strands wraps the botocore error
+    (ContextWindowOverflowException, EventLoopException).
+
+    Args:
+        error: Exception raised by the agent
+
+    Returns:
+        True for a context window overflow or a ValidationException about
+        the size of the request
+    """
+    seen = set()
+    current: Optional[BaseException] = error
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        if isinstance(current, ContextWindowOverflowException):
+            return True
+        response = getattr(current, "response", None)
+        code = (
+            response.get("Error", {}).get("Code", "")
+            if isinstance(response, dict)
+            else ""
+        )
+        if code.lower() == "validationexception":
+            message = str(current).lower()
+            if any(m in message for m in REQUEST_SIZE_ERROR_MESSAGES):
+                return True
+        current = current.__cause__ or current.__context__
+    return False
+
+
 def list_tools_sync(client: MCPClient) -> List[Dict[str, Any]]:
     """
     List available tools from an MCP client.
@@ -253,6 +613,84 @@ def list_tools_sync(client: MCPClient) -> List[Dict[str, Any]]:
         return []
 
 
+def open_mcp_tools(stack: ExitStack, mcp_servers: List[Dict[str, Any]]) -> List[Any]:
+    """
+    Build the MCP tools for the given server configurations.
+
+    Tool catalogs are served from tool_catalog_cache when possible. MCP clients
+    are started lazily, i.e. only for servers whose catalog is not cached or
+    whose tools the model actually calls. Servers whose catalog is not cached
+    are started and queried concurrently; a server that does not answer within
+    MCP_SERVER_STARTUP_TIMEOUT_SECONDS contributes no tools instead of stalling
+    the review. Started clients are stopped when the given ExitStack closes.
+
+    Args:
+        stack: ExitStack that owns the lifetime of the MCP clients
+        mcp_servers: List of MCP server configurations
+
+    Returns:
+        List of MCP tools from all servers
+    """
+    logger.info("Gathering tools from all MCP servers")
+    servers = []
+    for cfg in mcp_servers:
+        server = LazyMCPServer(cfg, create_mcp_client)
+        stack.callback(server.close)
+        servers.append(server)
+
+    catalogs: Dict[int, List[Any]] = {}
+    misses = []
+    for index, server in enumerate(servers):
+        tool_specs = tool_catalog_cache.get(server.spec_hash)
+        if tool_specs is None:
+            logger.info(f"Tool catalog cache miss for server {server.spec_hash[:12]}")
+            misses.append(index)
+        else:
+            logger.info(f"Tool catalog cache hit for server {server.spec_hash[:12]}")
+            catalogs[index] = tool_specs
+
+    if misses:
+        executor = ThreadPoolExecutor(max_workers=len(misses))
+        try:
+            futures = {
+                executor.submit(servers[index].list_tool_specs): index
+                for index in misses
+            }
+            done, not_done = wait(futures, timeout=MCP_SERVER_STARTUP_TIMEOUT_SECONDS)
+            for future in done:
+                index = futures[future]
+                server = servers[index]
+                try:
+                    catalogs[index] = future.result()
+                    tool_catalog_cache.put(server.spec_hash, catalogs[index])
+                except Exception as e:
+                    logger.warning(
+                        f"MCP server {server.spec_hash[:12]} failed to start, tools unavailable: {e}"
+                    )
+            for future in not_done:
+                server = servers[futures[future]]
+                logger.warning(
+                    f"MCP server {server.spec_hash[:12]} did not start within "
+                    f"{MCP_SERVER_STARTUP_TIMEOUT_SECONDS}s, tools unavailable"
+                )
+                server.close()
+        finally:
+            # Do not wait for servers that timed out
+            executor.shutdown(wait=False)
+
+    mcp_tools: List[Any] = []
+    for index, server in enumerate(servers):
+        mcp_tools.extend(
+            LazyMCPAgentTool(spec, server) for spec in catalogs.get(index, [])
+        )
+
+    logger.debug(f"Found total of {len(mcp_tools)} MCP tools")
+    for t in mcp_tools:
+        logger.debug("* MCP tool: %s", t.tool_name)
+
+    return mcp_tools
+
+
 def run_strands_agent(
     prompt: str,
     file_paths: List[str],
@@ -261,10 +699,46 @@ def run_strands_agent(
     temperature: float = 0.0,
     base_tools: Optional[List[Any]] = None,
     mcpServers: Optional[List[Dict[str, Any]]] = None,
+    mcp_tools: Optional[List[Any]] = None,
+    document_prefix: Optional[List[Dict[str, Any]]] = None,
 ) -> Dict[str, Any]:
     """
     Run the Strands agent with the given prompt and file paths.
 
+    Synchronous wrapper of run_strands_agent_async; see there for arguments.
+    """
+    return asyncio.run(
+        run_strands_agent_async(
+            prompt=prompt,
+            file_paths=file_paths,
+            model_id=model_id,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            base_tools=base_tools,
+            mcpServers=mcpServers,
+            mcp_tools=mcp_tools,
+            document_prefix=document_prefix,
+        )
+    )
+
+
+async def run_strands_agent_async(
+    prompt: str,
+    file_paths: List[str],
+    model_id: str = DOCUMENT_MODEL_ID,
+    system_prompt: str = "You are an expert document reviewer.",
+    temperature: float = 0.0,
+    base_tools: Optional[List[Any]] = None,
+    mcpServers: Optional[List[Dict[str, Any]]] = None,
+    mcp_tools: Optional[List[Any]] = None,
+    document_prefix: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Run the Strands agent with the given prompt and file paths.
+
+    The agent loop and MCP client startup are blocking, so they run in worker
+    threads; the event loop stays free to drive other reviews meanwhile.
+
     Args:
         prompt: Prompt for the agent
         file_paths: List of local file paths to process
@@ -273,6 +747,11 @@ def run_strands_agent(
         temperature: Temperature setting for the model
         base_tools: Base tools to include (file_read, image_reader, etc.)
         mcpServers: List of MCP server configurations to use
+        mcp_tools: MCP tools gathered by the caller (e.g. shared across a batch).
+            When given, mcpServers is ignored and no MCP clients are started here.
+        document_prefix: Messages from build_document_prefix to start the
+            conversation with. If Bedrock rejects them as too large, the
+            review is retried without them.
 
     Returns:
         Agent response
@@ -288,7 +767,9 @@ def run_strands_agent(
 
     logger.debug(f"mcpServers input: {type(mcpServers)}, value: {mcpServers}")
 
-    if mcpServers and isinstance(mcpServers, list) and len(mcpServers) > 0:
+    if mcp_tools is not None:
+        logger.info(f"Using {len(mcp_tools)} pre-gathered MCP tool(s)")
+    elif mcpServers and isinstance(mcpServers, list) and len(mcpServers) > 0:
         logger.info(f"Using {len(mcpServers)} MCP server(s)")
         mcp_servers = mcpServers
     else:
@@ -297,25 +778,10 @@ def run_strands_agent(
 
     logger.debug(f"Final MCP servers configuration: {mcp_servers}")
 
-    with ExitStack() as stack:
-        # Create MCP clients
-        logger.info("Creating MCP clients")
-        clients = [stack.enter_context(create_mcp_client(cfg)) for cfg in mcp_servers]
-
-        logger.info("Gathering tools from all MCP clients")
-
-        mcp_tools = list(
-            itertools.chain.from_iterable(client.list_tools_sync() for client in clients)
-        )
-
-        logger.debug(f"Found total of {len(mcp_tools)} MCP tools")
-        for t in mcp_tools:
-            tool_name = (
-                getattr(t, "tool_name", None)
-                or (t.get("name") if isinstance(t, dict) else None)
-                or getattr(t, "name", repr(t))
-            )
-            logger.debug("* MCP tool: %s", tool_name)
+    stack = ExitStack()
+    try:
+        if mcp_tools is None:
+            mcp_tools = await asyncio.to_thread(open_mcp_tools, stack, mcp_servers)
 
         # Use provided base tools or default to file_read
         tools_to_use = base_tools if base_tools else [file_read]
@@ -331,36 +797,70 @@ def run_strands_agent(
         logger.info(f"Model {model_id} caching support: {model_supports_cache}")
 
         # Configure BedrockModel with conditional caching
-        bedrock_config = {
-            "model_id": model_id,
-            "region_name": BEDROCK_REGION,
-            "temperature": temperature,
-            "streaming": False,  # Always disable streaming since this app doesn't use streaming
-        }
-
+        cache_type = None
         if model_supports_cache:
-            bedrock_config["cache_prompt"] = "default"  # Enable system prompt caching
-            bedrock_config["cache_tools"] = "default"  # Enable tool definitions caching
+            cache_type = "default"  # Enable system prompt and tool definitions caching
             logger.info("Caching enabled for system prompt and tools")
         else:
             logger.info("Caching disabled - model does not support prompt caching")
 
-        agent = Agent(
-            model=BedrockModel(**bedrock_config),
-            tools=tools,
-            system_prompt=system_prompt,
+        # The model (and its bedrock-runtime client) is shared across warm
+        # invocations; the Agent holds per-review conversation state.
+        # Every invocation is paced by the process-wide Bedrock scheduler
+        model = ScheduledModel(
+            get_bedrock_model(
+                model_id=model_id,
+                region_name=BEDROCK_REGION,
+                temperature=temperature,
+                cache_prompt=cache_type,
+                cache_tools=cache_type,
+            ),
+            bedrock_scheduler,
         )
 
-        # Add file references to the prompt
+        def invoke_agent(messages: Optional[List[Dict[str, Any]]]) -> Any:
+            # The sliding window trims the oldest messages, which would drop
+            # the document prefix silently. With a prefix, an overflow is
+            # raised instead and the review retried without it (see below).
+            conversation_manager = (
+                NullConversationManager()
+                if messages
+                else SlidingWindowConversationManager()
+            )
+            agent = Agent(
+                model=model,
+                messages=messages,
+                tools=tools,
+                system_prompt=system_prompt,
+                conversation_manager=conversation_manager,
+                # Skip the ./tools directory scan and file watcher on every review
+                load_tools_from_directory=False,
+            )
+            return agent(full_prompt)
+
+        # File references first and the prompt last, so that everything
+        # before the prompt stays identical across checks
         files_prompt = "\n".join([f"- '{file_path}'" for file_path in file_paths])
-        full_prompt = f"{prompt}\n\nPlease analyze the following files:\n{files_prompt}"
+        full_prompt = f"Please analyze the following files:\n{files_prompt}\n\n{prompt}"
 
         logger.info(f"Running agent with prompt: {full_prompt[:100]}...")
         logger.debug(f"Full prompt: {full_prompt}")
 
-        # Run agent synchronously
+        # strands has no awaitable invocation that returns the AgentResult
+        # (stream_async drops it), so run the agent in a worker thread
         logger.info("Executing agent completion")
-        response = agent(full_prompt)
+        document_prefix_used = document_prefix is not None
+        try:
+            # The agent appends to its messages; the prefix itself is shared
+            response = await asyncio.to_thread(
+                invoke_agent, list(document_prefix) if document_prefix else None
+            )
+        except Exception as e:
+            if not document_prefix_used or not is_request_size_error(e):
+                raise
+            logger.warning(f"Document prefix rejected, retrying without it: {e}")
+            document_prefix_used = False
+            response = await asyncio.to_thread(invoke_agent, None)
         logger.debug("Agent response received")
 
         result = agent_message_to_dict(response.message)
@@ -368,17 +868,24 @@ def run_strands_agent(
         logger.debug("message.content (trunc)=%s", str(response.message)[:300])
 
         logger.info("Extracting usage metrics from agent result")
-        review_meta = meta_tracker.get_review_meta(response)
+        review_meta = meta_tracker.get_review_meta(response, model.usage)
+        review_meta["bedrock_scheduling"] = model.get_meta()
+        review_meta["prompt_cache"] = {"document_prefix": document_prefix_used}
         result["reviewMeta"] = review_meta
         result["inputTokens"] = review_meta["input_tokens"]
         result["outputTokens"] = review_meta["output_tokens"]
         result["totalCost"] = review_meta["total_cost"]
 
         logger.info(
-            f"Token usage: input={review_meta['input_tokens']}, output={review_meta['output_tokens']}, cost=${review_meta['total_cost']:.6f}"
+            f"Token usage: input={review_meta['input_tokens']}, output={review_meta['output_tokens']}, "
+            f"cache_read={review_meta['cache_read_input_tokens']}, cache_write={review_meta['cache_write_input_tokens']}, "
+            f"cost=${review_meta['total_cost']:.6f} (saved ${review_meta['cache_savings']:.6f})"
         )
         logger.debug(f"Extracted result dict: {result}")
         return result
+    finally:
+        # Stopping MCP clients joins their threads
+        await asyncio.to_thread(stack.close)
 
 
 def agent_message_to_dict(message: Any) -> Dict[str, Any]:
@@ -415,29 +922,35 @@ def agent_message_to_dict(message: Any) -> Dict[str, Any]:
     return fallback
 
 
-def get_document_review_prompt(
-    language_name: str, check_name: str, check_description: str
-) -> str:
+def get_document_review_system_prompt(language_name: str) -> str:
     """
-    Get the PDF document review prompt template.
+    Get the PDF document review instructions.
+
+    Everything here is identical for every check of a review in the same
+    language, so it is sent as the (cached) system prompt; the check item
+    itself comes last in the user message (see get_review_check_prompt).
 
     Args:
         language_name: Language name to use in the prompt
-        check_name: Name of the check item
-        check_description: Description of the check item
 
     Returns:
-        Formatted prompt template
+        System prompt
     """
     return f"""
-You are an AI assistant that reviews documents.
-Please review the provided documents based on the following check item.
-
-Check item: {check_name}
-Description: {check_description}
+You are an expert document reviewer and an AI assistant that reviews documents.
+Please review the provided documents based on the check item given at the end
+of the user message.
 
 ## DOCUMENT ACCESS
-The actual files are attached. Use the provided *file_read* tool to open and inspect each file.
+The actual files are attached. Use the provided *read_document* tool to get the page count of a
+file, read a range of its pages or search it. *file_read* may also be available for small files.
+Files named `*-pages.txt` contain the extracted text of a document; every page starts with a
+`--- Page N ---` marker. Take "pageNumber" from the marker of the page the evidence is on.
+A page without a text layer (e.g. a scanned page) names the original file instead of its text;
+read that page of the original file with *read_document* to see the page itself.
+Files named `*-excerpt-*.txt` contain only the pages of a long document that are most relevant to
+the check item. Before concluding that something is missing from the document, search or read the
+full text file named in the first line of the excerpt.
 
 ## WHEN & HOW TO USE MCP TOOLS
 You have access to additional MCP tools.   
@@ -521,14 +1034,10 @@ REMEMBER: YOUR ENTIRE RESPONSE, INCLUDING EVERY VALUE INSIDE THE JSON, MUST BE I
 """.strip()
 
 
-def get_image_review_prompt(
-    language_name: str,
-    check_name: str,
-    check_description: str,
-    model_id: str,
-) -> str:
+def get_image_review_system_prompt(language_name: str, model_id: str) -> str:
     """
-    Build an image-review prompt that automatically switches:
+    Build the image-review instructions (sent as the cached system prompt;
+    the check item comes last in the user message). They automatically switch:
 
     * If `model_id` contains "amazon.nova" → include bounding-box instructions
       and the "boundingBoxes" field in the JSON schema.
@@ -562,12 +1071,10 @@ box coordinates in [x1, y1, x2, y2] format (0–1000 scale).
     )
 
     return f"""
-You are an AI assistant who reviews images.
+You are an expert document reviewer and an AI assistant who reviews images.
 (Model ID: {model_id})
-Please review the provided image(s) based on the following check item.
-
-Check item: {check_name}
-Description: {check_description}
+Please review the provided image(s) based on the check item given at the end
+of the user message.
 
 ## DOCUMENT ACCESS
 The actual files are attached. Use the *image_reader* tool to analyze them.
@@ -625,6 +1132,544 @@ MUST BE IN {language_name}.
 """.strip()
 
 
+def get_review_check_prompt(check_name: str, check_description: str) -> str:
+    """
+    Get the per-check part of the review prompt.
+
+    Args:
+        check_name: Name of the check item
+        check_description: Description of the check item
+
+    Returns:
+        Check item section placed at the end of the user message
+    """
+    return f"""
+Check item: {check_name}
+Description: {check_description}
+""".strip()
+
+
+def download_documents(
+    s3_client: Any,
+    document_bucket: str,
+    document_paths: List[str],
+    temp_dir: str,
+) -> Tuple[List[str], bool, Dict[str, Any]]:
+    """
+    Download the review documents from S3 into a working directory.
+
+    Files are fetched concurrently on a bounded thread pool; large files are
+    additionally split into ranged multipart GETs by the S3 transfer manager.
+
+    Args:
+        s3_client: boto3 S3 client
+        document_bucket: S3 bucket containing the documents
+        document_paths: List of S3 keys to the documents
+        temp_dir: Local directory to download the documents into
+
+    Returns:
+        Tuple of (sanitized local file paths in input order, whether any file
+        is an image, per-file download timings for reviewMeta)
+    """
+    logger.info(f"Downloading {len(document_paths)} files from S3")
+    started = time.time()
+
+    # Track file types
+    has_images = False
+
+    # Dictionary to map sanitized file paths to original file paths
+    sanitized_file_paths = []
+
+    for path in document_paths:
+        # Get original basename
+        original_basename = os.path.basename(path)
+
+        # Create sanitized filename
+        sanitized_basename = sanitize_file_name(original_basename)
+        if original_basename != sanitized_basename:
+            logger.info(
+                f"Sanitized filename '{original_basename}' to '{sanitized_basename}'"
+            )
+
+        ext = os.path.splitext(original_basename)[1].lower()  # Preserve file extension
+        sanitized_file_paths.append(os.path.join(temp_dir, sanitized_basename + ext))
+
+        # Check if this is an image file
+        if ext in IMAGE_FILE_EXTENSIONS:
+            has_images = True
+            logger.info(f"Detected image file: {original_basename}")
+
+    def download(path: str, sanitized_path: str) -> Dict[str, Any]:
+        logger.debug(f"Downloading {path} to {sanitized_path}")
+        file_started = time.time()
+        fetch_info = document_cache.fetch(
+            s3_client,
+            document_bucket,
+            path,
+            sanitized_path,
+            transfer_config=S3_TRANSFER_CONFIG,
+        )
+        if fetch_info["cache_hit"]:
+            logger.info(f"Reused cached {path} for {sanitized_path}")
+        else:
+            logger.info(f"Downloaded {path} to {sanitized_path}")
+        return {
+            "path": path,
+            "bytes": fetch_info["bytes"],
+            "cache_hit": fetch_info["cache_hit"],
+            "etag": fetch_info.get("etag"),
+            "duration_seconds": round(time.time() - file_started, 3),
+        }
+
+    workers = max(1, min(S3_DOWNLOAD_MAX_WORKERS, len(document_paths)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        file_timings = list(
+            executor.map(download, document_paths, sanitized_file_paths)
+        )
+
+    download_meta = {
+        "duration_seconds": round(time.time() - started, 3),
+        "total_bytes": sum(t["bytes"] for t in file_timings),
+        "files": file_timings,
+    }
+    logger.info(
+        f"Downloaded {len(document_paths)} files in {download_meta['duration_seconds']}s"
+    )
+    return sanitized_file_paths, has_images, download_meta
+
+
+def extract_document_texts(
+    s3_client: Any,
+    document_bucket: str,
+    local_file_paths: List[str],
+    download_meta: Dict[str, Any],
+) -> Tuple[List[str], Dict[str, Any], Dict[str, PageIndex]]:
+    """
+    Replace the downloaded documents by their page-marked extracted text.
+
+    The text of each document version is extracted at most once (see
+    document_text.DocumentTextStore) and rendered next to the download as
+    `<name>-pages.txt`. Documents whose text cannot be extracted (unsupported
+    formats, scanned PDFs without a text layer, extraction errors) are kept
+    as they are. When only some pages have a text layer, the empty pages
+    refer the agent to the original PDF, which stays available through
+    read_document.
+
+    Args:
+        s3_client: boto3 S3 client
+        document_bucket: S3 bucket containing the documents
+        local_file_paths: Downloaded files, in the order of download_meta["files"]
+        download_meta: Download metadata returned by download_documents
+
+    Returns:
+        Tuple of (file paths to give to the agent, extraction metadata for
+        reviewMeta, page indexes of the extracted text files by path)
+    """
+    started = time.time()
+
+    def extract(file_path: str, file_meta: Dict[str, Any]) -> Dict[str, Any]:
+        info: Dict[str, Any] = {"path": file_meta["path"], "extracted": False}
+        if not supports_extraction(file_path):
+            return {**info, "agent_path": file_path}
+        try:
+            artifact = document_text_store.get_or_extract(
+                s3_client,
+                document_bucket,
+                file_meta["path"],
+                file_meta.get("etag"),
+                file_path,
+            )
+        except Exception as e:
+            logger.warning(f"Text extraction failed for {file_meta['path']}: {e}")
+            return {**info, "agent_path": file_path, "error": str(e)}
+
+        info["pages"] = len(artifact["pages"])
+        info["cache"] = artifact["cache"]
+        empty_pages = [p["page"] for p in artifact["pages"] if not p["text"].strip()]
+        if len(empty_pages) == len(artifact["pages"]):
+            logger.info(f"No text layer in {file_meta['path']}, keeping the original")
+            return {**info, "agent_path": file_path}
+        if empty_pages:
+            info["pages_without_text"] = empty_pages
+
+        text_path = f"{os.path.splitext(file_path)[0]}-pages.txt"
+        with open(text_path, "w", encoding="utf-8") as f:
+            f.write(render_pages(artifact, original_path=file_path))
+        info = {**info, "agent_path": text_path, "extracted": True}
+        if PAGE_RETRIEVAL_ENABLED:
+            info["page_index"] = get_page_index(artifact["key"], artifact["pages"])
+        return info
+
+    workers = max(1, min(S3_DOWNLOAD_MAX_WORKERS, len(local_file_paths)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(
+            executor.map(extract, local_file_paths, download_meta["files"])
+        )
+
+    extraction_meta = {
+        "duration_seconds": round(time.time() - started, 3),
+        "files": [
+            {k: v for k, v in r.items() if k not in ("agent_path", "page_index")}
+            for r in results
+        ],
+    }
+    logger.info(
+        f"Prepared text of {sum(r['extracted'] for r in results)} of "
+        f"{len(results)} files in {extraction_meta['duration_seconds']}s"
+    )
+    page_indexes = {
+        r["agent_path"]: r["page_index"] for r in results if "page_index" in r
+    }
+    return [r["agent_path"] for r in results], extraction_meta, page_indexes
+
+
+def select_check_pages(
+    file_paths: List[str],
+    page_indexes: Dict[str, PageIndex],
+    check_name: str,
+    check_description: str,
+) -> Tuple[List[str], List[str], List[Dict[str, Any]]]:
+    """
+    Narrow long documents down to the pages relevant to one check.
+
+    For every indexed text file the pages matching the check are written to
+    a separate `<name>-excerpt-<id>.txt`, which replaces the full text in the
+    agent's input. Documents for which retrieval is not confident are given
+    in full (see page_index.PageIndex.select_pages).
+
+    Args:
+        file_paths: File paths prepared for the agent
+        page_indexes: Page indexes of the extracted text files by path
+        check_name: Name of the check item
+        check_description: Description of the check item
+
+    Returns:
+        Tuple of (file paths for this check, excerpt files created for this
+        check, retrieval details for reviewMeta)
+    """
+    query = f"{check_name}\n{check_description}"
+    check_file_paths = []
+    excerpt_paths = []
+    retrieval_meta = []
+
+    for file_path in file_paths:
+        index = page_indexes.get(file_path)
+        if index is None:
+            check_file_paths.append(file_path)
+            continue
+
+        pages, meta = index.select_pages(query)
+        retrieval_meta.append({"file": os.path.basename(file_path), **meta})
+        if pages is None:
+            check_file_paths.append(file_path)
+            continue
+
+        # Unique per check: checks of a batch run concurrently
+        excerpt_path = (
+            f"{file_path[: -len('-pages.txt')]}-excerpt-{uuid.uuid4().hex[:8]}.txt"
+        )
+        header = (
+            f"Excerpt: pages {', '.join(str(p['page']) for p in pages)} of "
+            f"{len(index.pages)}, selected for this check. "
+            f"The full text is in {file_path}.\n\n"
+        )
+        with open(excerpt_path, "w", encoding="utf-8") as f:
+            f.write(header + render_pages({"pages": pages}))
+        check_file_paths.append(excerpt_path)
+        excerpt_paths.append(excerpt_path)
+
+    return check_file_paths, excerpt_paths, retrieval_meta
+
+
+async def prepare_documents(
+    s3_client: Any,
+    document_bucket: str,
+    document_paths: List[str],
+    temp_dir: str,
+) -> Dict[str, Any]:
+    """
+    Download the documents and prepare them for the agent.
+
+    Document reviews get the extracted text of the documents, image reviews
+    get normalized images without near-duplicates.
+
+    Args:
+        s3_client: boto3 S3 client
+        document_bucket: S3 bucket containing the documents
+        document_paths: List of S3 keys to the documents
+        temp_dir: Local directory to download the documents into
+
+    Returns:
+        {
+            "local_file_paths": downloaded file paths,
+            "agent_file_paths": file paths to give to the agent,
+            "has_images": whether any file is an image,
+            "meta": reviewMeta entries,
+            "page_indexes": page indexes of the extracted text files,
+            "image_index_map": maps the agent's image indexes back to
+                document_paths (None if unchanged),
+        }
+    """
+    # The transfer manager, caches and extraction are blocking, so they run
+    # in worker threads
+    local_file_paths, has_images, download_meta = await asyncio.to_thread(
+        download_documents, s3_client, document_bucket, document_paths, temp_dir
+    )
+    meta: Dict[str, Any] = {"document_downloads": download_meta}
+
+    agent_file_paths = local_file_paths
+    page_indexes: Dict[str, PageIndex] = {}
+    image_index_map = None
+    if has_images:
+        if IMAGE_NORMALIZATION_ENABLED:
+            (
+                agent_file_paths,
+                image_index_map,
+                meta["image_normalization"],
+            ) = await asyncio.to_thread(normalize_images, local_file_paths)
+        if IMAGE_DEDUPE_ENABLED:
+            (
+                agent_file_paths,
+                image_index_map,
+                meta["image_dedupe"],
+            ) = await asyncio.to_thread(
+                dedupe_images, agent_file_paths, image_index_map
+            )
+    # Image reviews read the images themselves
+    elif DOCUMENT_TEXT_EXTRACTION_ENABLED:
+        (
+            agent_file_paths,
+            meta["document_text"],
+            page_indexes,
+        ) = await asyncio.to_thread(
+            extract_document_texts,
+            s3_client,
+            document_bucket,
+            local_file_paths,
+            download_meta,
+        )
+    return {
+        "local_file_paths": local_file_paths,
+        "agent_file_paths": agent_file_paths,
+        "has_images": has_images,
+        "meta": meta,
+        "page_indexes": page_indexes,
+        "image_index_map": image_index_map,
+    }
+
+
+def cleanup_documents(temp_dir: str, local_file_paths: List[str]) -> None:
+    """
+    Remove downloaded documents and their working directory.
+
+    Args:
+        temp_dir: Working directory created for the review
+        local_file_paths: Files downloaded into the working directory
+    """
+    logger.info("Cleaning up temporary files")
+    for file_path in local_file_paths:
+        if os.path.exists(file_path):
+            logger.debug(f"Removing temporary file: {file_path}")
+            os.remove(file_path)
+    if os.path.exists(temp_dir):
+        logger.debug(f"Removing temporary directory: {temp_dir}")
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    logger.info("Cleanup complete")
+
+
+def review_local_documents(
+    local_file_paths: List[str],
+    has_images: bool,
+    check_name: str,
+    check_description: str,
+    language_name: str = "日本語",
+    model_id: str = DOCUMENT_MODEL_ID,
+    mcpServers: Optional[List[Dict[str, Any]]] = None,
+    mcp_tools: Optional[List[Any]] = None,
+    page_indexes: Optional[Dict[str, PageIndex]] = None,
+) -> Dict[str, Any]:
+    """
+    Review already-downloaded documents against a single check item.
+
+    Synchronous wrapper of review_local_documents_async; see there for arguments.
+    """
+    return asyncio.run(
+        review_local_documents_async(
+            local_file_paths=local_file_paths,
+            has_images=has_images,
+            check_name=check_name,
+            check_description=check_description,
+            language_name=language_name,
+            model_id=model_id,
+            mcpServers=mcpServers,
+            mcp_tools=mcp_tools,
+            page_indexes=page_indexes,
+        )
+    )
+
+
+async def review_local_documents_async(
+    local_file_paths: List[str],
+    has_images: bool,
+    check_name: str,
+    check_description: str,
+    language_name: str = "日本語",
+    model_id: str = DOCUMENT_MODEL_ID,
+    mcpServers: Optional[List[Dict[str, Any]]] = None,
+    mcp_tools: Optional[List[Any]] = None,
+    page_indexes: Optional[Dict[str, PageIndex]] = None,
+) -> Dict[str, Any]:
+    """
+    Review already-downloaded documents against a single check item.
+
+    Args:
+        local_file_paths: Local paths of the downloaded documents
+        has_images: Whether any of the documents is an image
+        check_name: Name of the check item
+        check_description: Description of the check item
+        language_name: Language to use for the review
+        model_id: Bedrock model ID to use
+        mcpServers: MCP servers configuration to use
+        mcp_tools: MCP tools already gathered by the caller
+        page_indexes: Page indexes of extracted text files, used to give the
+            agent only the pages relevant to the check
+
+    Returns:
+        Review results
+    """
+    # Select appropriate model and prompt based on file types
+    # The instructions only depend on language and model, so they form the
+    # cacheable system prompt; the check item goes last in the user message
+    selected_model_id = model_id
+    if has_images:
+        # Use image-specific model
+        selected_model_id = IMAGE_MODEL_ID
+        logger.info(f"Using image processing model: {selected_model_id}")
+        system_prompt = get_image_review_system_prompt(
+            language_name, selected_model_id
+        )
+        logger.info("Using image review prompt template")
+    else:
+        # Use document processing model for non-image files
+        selected_model_id = DOCUMENT_MODEL_ID
+        system_prompt = get_document_review_system_prompt(language_name)
+        logger.info("Using document review prompt template")
+    prompt = get_review_check_prompt(check_name, check_description)
+
+    # Select tools based on file types
+    if has_images:
+        tools = [file_read, image_reader]
+        logger.info("Added image_reader tool for image processing")
+    elif needs_paged_reading(local_file_paths):
+        # Whole-file reads of large documents exhaust memory and tokens
+        tools = [read_document]
+        logger.info("Large documents: offering read_document only")
+    else:
+        tools = [read_document, file_read]
+
+    # Give long documents only the pages relevant to this check
+    check_file_paths = local_file_paths
+    excerpt_paths: List[str] = []
+    retrieval_meta: List[Dict[str, Any]] = []
+    if page_indexes:
+        check_file_paths, excerpt_paths, retrieval_meta = await asyncio.to_thread(
+            select_check_pages,
+            local_file_paths,
+            page_indexes,
+            check_name,
+            check_description,
+        )
+        logger.info(f"Page retrieval: {retrieval_meta}")
+
+    try:
+        # Attach the documents as a cached prefix shared by all checks. The
+        # prefix must be identical for every check to be read from the cache,
+        # so it is built from the full documents only; a check that was given
+        # per-check excerpts sends them in the prompt instead.
+        document_prefix = None
+        if excerpt_paths:
+            document_input = "excerpt"
+        elif DOCUMENT_PREFIX_CACHE_ENABLED and supports_caching(selected_model_id):
+            document_prefix = await asyncio.to_thread(
+                build_document_prefix, local_file_paths
+            )
+            document_input = "cached_prefix" if document_prefix else "files"
+        else:
+            document_input = "files"
+        logger.info(f"Document input mode: {document_input}")
+
+        # Run agent with flattened parameters
+        logger.info("Running Strands agent for document review")
+        result = await run_strands_agent_async(
+            prompt=prompt,
+            file_paths=check_file_paths,
+            model_id=selected_model_id,
+            system_prompt=system_prompt,
+            base_tools=tools,
+            mcpServers=mcpServers,
+            mcp_tools=mcp_tools,
+            document_prefix=document_prefix,
+        )
+    finally:
+        for excerpt_path in excerpt_paths:
+            if os.path.exists(excerpt_path):
+                os.remove(excerpt_path)
+    logger.info(f"Agent completed with result: {result['result']}")
+    prompt_cache = result["reviewMeta"]["prompt_cache"]
+    if not prompt_cache["document_prefix"] and document_input == "cached_prefix":
+        # The prefix was rejected as too large and the files were sent instead
+        document_input = "files"
+    prompt_cache["document_input"] = document_input
+    if retrieval_meta:
+        result["reviewMeta"]["page_retrieval"] = retrieval_meta
+
+    # Ensure all required fields exist
+    logger.debug("Validating result fields")
+    if "result" not in result:
+        logger.debug("Adding missing 'result' field")
+        result["result"] = "fail"
+    if "confidence" not in result:
+        logger.debug("Adding missing 'confidence' field")
+        result["confidence"] = 0.5
+    if "explanation" not in result:
+        logger.debug("Adding missing 'explanation' field")
+        result["explanation"] = "No explanation provided"
+    if "shortExplanation" not in result:
+        logger.debug("Adding missing 'shortExplanation' field")
+        result["shortExplanation"] = "No short explanation provided"
+    if "verificationDetails" not in result:
+        logger.debug("Adding missing 'verificationDetails' field")
+        result["verificationDetails"] = {"sourcesDetails": []}
+    elif "sourcesDetails" not in result["verificationDetails"]:
+        logger.debug("Adding missing 'sourcesDetails' field")
+        result["verificationDetails"]["sourcesDetails"] = []
+
+    # Add file type specific fields and explicit reviewType
+    if has_images:
+        # Add image-specific fields if missing
+        result["reviewType"] = "IMAGE"
+        if "usedImageIndexes" not in result:
+            logger.debug("Adding missing 'usedImageIndexes' field")
+            result["usedImageIndexes"] = []
+        if "boundingBoxes" not in result:
+            logger.debug("Adding missing 'boundingBoxes' field")
+            result["boundingBoxes"] = []
+    else:
+        # Add PDF-specific fields if missing
+        result["reviewType"] = "PDF"
+        if "extractedText" not in result:
+            logger.debug("Adding missing 'extractedText' field")
+            result["extractedText"] = ""
+        if "pageNumber" not in result:
+            logger.debug("Adding missing 'pageNumber' field")
+            result["pageNumber"] = 1
+
+    logger.info(
+        f"Document review completed successfully with reviewType: {result['reviewType']}"
+    )
+    return result
+
+
 def process_review(
     document_bucket: str,
     document_paths: list,
@@ -637,6 +1682,33 @@ def process_review(
     """
     Process a document review using Strands agent with local file reading.
 
+    Synchronous wrapper of process_review_async; see there for arguments.
+    """
+    return asyncio.run(
+        process_review_async(
+            document_bucket=document_bucket,
+            document_paths=document_paths,
+            check_name=check_name,
+            check_description=check_description,
+            language_name=language_name,
+            model_id=model_id,
+            mcpServers=mcpServers,
+        )
+    )
+
+
+async def process_review_async(
+    document_bucket: str,
+    document_paths: list,
+    check_name: str,
+    check_description: str,
+    language_name: str = "日本語",
+    model_id: str = DOCUMENT_MODEL_ID,
+    mcpServers: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Process a document review using Strands agent with local file reading.
+
     Args:
         document_bucket: S3 bucket containing the documents
         document_paths: List of S3 keys to the documents
@@ -659,140 +1731,150 @@ def process_review(
     logger.debug(f"Created temporary directory: {temp_dir}")
     local_file_paths = []
 
-    # Track file types
-    has_images = False
-
     try:
-        # Download files from S3
-        logger.info(f"Downloading {len(document_paths)} files from S3")
-        s3_client = boto3.client("s3")
-
-        # Dictionary to map sanitized file paths to original file paths
-        sanitized_file_paths = []
-
-        for path in document_paths:
-            # Get original basename
-            original_basename = os.path.basename(path)
-
-            # Create sanitized filename
-            sanitized_basename = sanitize_file_name(original_basename)
-            if original_basename != sanitized_basename:
-                logger.info(
-                    f"Sanitized filename '{original_basename}' to '{sanitized_basename}'"
-                )
-
-            # Download to sanitized path
-            ext = os.path.splitext(original_basename)[
-                1
-            ].lower()  # Preserve file extension
-            sanitized_path = os.path.join(temp_dir, sanitized_basename + ext)
-            logger.debug(f"Downloading {path} to {sanitized_path}")
-
-            s3_client.download_file(document_bucket, path, sanitized_path)
-            sanitized_file_paths.append(sanitized_path)
-            logger.info(f"Downloaded {path} to {sanitized_path}")
+        # Download files from S3 and prepare them for the agent
+        s3_client = get_boto3_client("s3")
+        documents = await prepare_documents(
+            s3_client, document_bucket, document_paths, temp_dir
+        )
+        local_file_paths = documents["local_file_paths"]
+
+        result = await review_local_documents_async(
+            local_file_paths=documents["agent_file_paths"],
+            has_images=documents["has_images"],
+            check_name=check_name,
+            check_description=check_description,
+            language_name=language_name,
+            model_id=model_id,
+            mcpServers=mcpServers,
+            page_indexes=documents["page_indexes"],
+        )
+        if documents["image_index_map"] is not None:
+            remap_image_indexes(result, documents["image_index_map"])
+        result["reviewMeta"].update(documents["meta"])
+        return result
 
-            # Check if this is an image file
-            if ext in IMAGE_FILE_EXTENSIONS:
-                has_images = True
-                logger.info(f"Detected image file: {original_basename}")
-
-        # Use sanitized file paths for agent
-        local_file_paths = sanitized_file_paths
-
-        # Select appropriate model and prompt based on file types
-        selected_model_id = model_id
-        if has_images:
-            # Use image-specific model
-            selected_model_id = IMAGE_MODEL_ID
-            logger.info(f"Using image processing model: {selected_model_id}")
-            prompt = get_image_review_prompt(
-                language_name, check_name, check_description, selected_model_id
-            )
-            logger.info("Using image review prompt template")
-        else:
-            # Use document processing model for non-image files
-            selected_model_id = DOCUMENT_MODEL_ID
-            prompt = get_document_review_prompt(
-                language_name, check_name, check_description
-            )
-            logger.info("Using document review prompt template")
+    finally:
+        # Clean up temporary files
+        cleanup_documents(temp_dir, local_file_paths)
 
-        # Select tools based on file types
-        tools = [file_read]
-        if has_images:
-            tools.append(image_reader)
-            logger.info("Added image_reader tool for image processing")
 
-        # Define system prompt
-        system_prompt = f"You are an expert document reviewer. Analyze the provided files and evaluate the check item. All responses must be in {language_name}."
+def process_review_batch(
+    document_bucket: str,
+    document_paths: list,
+    checks: List[Dict[str, Any]],
+    language_name: str = "日本語",
+    model_id: str = DOCUMENT_MODEL_ID,
+    mcpServers: Optional[List[Dict[str, Any]]] = None,
+    max_workers: int = REVIEW_BATCH_MAX_WORKERS,
+) -> List[Dict[str, Any]]:
+    """
+    Review many check items against the same set of documents.
 
-        # Run agent with flattened parameters
-        logger.info("Running Strands agent for document review")
-        result = run_strands_agent(
-            prompt=prompt,
-            file_paths=local_file_paths,
-            model_id=selected_model_id,
-            system_prompt=system_prompt,
-            base_tools=tools,
+    Synchronous wrapper of process_review_batch_async; see there for arguments.
+    """
+    return asyncio.run(
+        process_review_batch_async(
+            document_bucket=document_bucket,
+            document_paths=document_paths,
+            checks=checks,
+            language_name=language_name,
+            model_id=model_id,
             mcpServers=mcpServers,
+            max_workers=max_workers,
         )
-        logger.info(f"Agent completed with result: {result['result']}")
-
-        # Ensure all required fields exist
-        logger.debug("Validating result fields")
-        if "result" not in result:
-            logger.debug("Adding missing 'result' field")
-            result["result"] = "fail"
-        if "confidence" not in result:
-            logger.debug("Adding missing 'confidence' field")
-            result["confidence"] = 0.5
-        if "explanation" not in result:
-            logger.debug("Adding missing 'explanation' field")
-            result["explanation"] = "No explanation provided"
-        if "shortExplanation" not in result:
-            logger.debug("Adding missing 'shortExplanation' field")
-            result["shortExplanation"] = "No short explanation provided"
-        if "verificationDetails" not in result:
-            logger.debug("Adding missing 'verificationDetails' field")
-            result["verificationDetails"] = {"sourcesDetails": []}
-        elif "sourcesDetails" not in result["verificationDetails"]:
-            logger.debug("Adding missing 'sourcesDetails' field")
-            result["verificationDetails"]["sourcesDetails"] = []
-
-        # Add file type specific fields and explicit reviewType
-        if has_images:
-            # Add image-specific fields if missing
-            result["reviewType"] = "IMAGE"
-            if "usedImageIndexes" not in result:
-                logger.debug("Adding missing 'usedImageIndexes' field")
-                result["usedImageIndexes"] = []
-            if "boundingBoxes" not in result:
-                logger.debug("Adding missing 'boundingBoxes' field")
-                result["boundingBoxes"] = []
-        else:
-            # Add PDF-specific fields if missing
-            result["reviewType"] = "PDF"
-            if "extractedText" not in result:
-                logger.debug("Adding missing 'extractedText' field")
-                result["extractedText"] = ""
-            if "pageNumber" not in result:
-                logger.debug("Adding missing 'pageNumber' field")
-                result["pageNumber"] = 1
+    )
 
-        logger.info(
-            f"Document review completed successfully with reviewType: {result['reviewType']}"
+
+async def process_review_batch_async(
+    document_bucket: str,
+    document_paths: list,
+    checks: List[Dict[str, Any]],
+    language_name: str = "日本語",
+    model_id: str = DOCUMENT_MODEL_ID,
+    mcpServers: Optional[List[Dict[str, Any]]] = None,
+    max_workers: int = REVIEW_BATCH_MAX_WORKERS,
+) -> List[Dict[str, Any]]:
+    """
+    Review many check items against the same set of documents.
+
+    The documents are downloaded once and the MCP clients are started once;
+    every check then runs its own agent, at most max_workers at a time.
+
+    Args:
+        document_bucket: S3 bucket containing the documents
+        document_paths: List of S3 keys to the documents
+        checks: Check items, each with checkId, reviewResultId, checkName
+            and checkDescription
+        language_name: Language to use for the review
+        model_id: Bedrock model ID to use
+        mcpServers: MCP servers configuration to use
+        max_workers: Maximum number of checks reviewed concurrently
+
+    Returns:
+        One entry per check, in input order. Successful entries carry
+        status "success" and the review results; failed entries carry
+        status "error" and a message.
+    """
+    logger.info(
+        f"Processing batch review of {len(checks)} checks "
+        f"(max_workers={max_workers})"
+    )
+    logger.info(f"Documents: {len(document_paths)} files from bucket {document_bucket}")
+    logger.debug(f"Document paths: {document_paths}")
+
+    temp_dir = tempfile.mkdtemp()
+    logger.debug(f"Created temporary directory: {temp_dir}")
+    local_file_paths = []
+    stack = ExitStack()
+
+    try:
+        s3_client = get_boto3_client("s3")
+        documents = await prepare_documents(
+            s3_client, document_bucket, document_paths, temp_dir
         )
-        return result
+        local_file_paths = documents["local_file_paths"]
+
+        # MCP tools are shared by every check in the batch
+        mcp_tools = await asyncio.to_thread(open_mcp_tools, stack, mcpServers or [])
+        semaphore = asyncio.Semaphore(max(1, max_workers))
+
+        async def review_check(check: Dict[str, Any]) -> Dict[str, Any]:
+            check_id = check.get("checkId", "")
+            review_result_id = check.get("reviewResultId", "")
+            try:
+                async with semaphore:
+                    review_data = await review_local_documents_async(
+                        local_file_paths=documents["agent_file_paths"],
+                        has_images=documents["has_images"],
+                        check_name=check.get("checkName", ""),
+                        check_description=check.get("checkDescription", ""),
+                        language_name=language_name,
+                        model_id=model_id,
+                        mcp_tools=mcp_tools,
+                        page_indexes=documents["page_indexes"],
+                    )
+                if documents["image_index_map"] is not None:
+                    remap_image_indexes(review_data, documents["image_index_map"])
+                # The download and preparation are shared by every check
+                review_data["reviewMeta"].update(documents["meta"])
+                return {
+                    "status": "success",
+                    "checkId": check_id,
+                    "reviewResultId": review_result_id,
+                    "reviewData": review_data,
+                }
+            except Exception as e:
+                logger.exception(f"Review failed for check {check_id}: {e}")
+                return {
+                    "status": "error",
+                    "checkId": check_id,
+                    "reviewResultId": review_result_id,
+                    "message": str(e),
+                }
+
+        return list(await asyncio.gather(*(review_check(c) for c in checks)))
 
     finally:
-        # Clean up temporary files
-        logger.info("Cleaning up temporary files")
-        for file_path in local_file_paths:
-            if os.path.exists(file_path):
-                logger.debug(f"Removing temporary file: {file_path}")
-                os.remove(file_path)
-        if os.path.exists(temp_dir):
-            logger.debug(f"Removing temporary directory: {temp_dir}")
-            os.rmdir(temp_dir)
-        logger.info("Cleanup complete")
+        await asyncio.to_thread(stack.close)
+        cleanup_documents(temp_dir, local_file_paths)
@@ -0,0 +1,340 @@
+"""
+Adaptive rate limiting of Bedrock model invocations.
+
+When a large job fans out, every review calls Bedrock independently and the
+whole fleet runs into throttling at once; strands then retries with a fixed
+exponential backoff and without jitter, so the retries collide again. This
+module paces invocations before they are sent:
+
+  ▸ a token bucket per model ID for requests per minute (RPM) and tokens per
+    minute (TPM), refilled continuously,
+  ▸ AIMD on the effective limits: a throttling response halves them (or, for
+    models without configured limits, sets them below the observed rate),
+    every successful invocation raises them again by a small step.
+
+Throttled invocations are retried by the strands event loop only; each retry
+passes through the scheduler again and so waits for the reduced limits.
+
+State is shared by all reviews in the process. Setting
+BEDROCK_SCHEDULER_STATE_FILE shares it across processes on the same host
+through a file protected by an advisory lock.
+
+ScheduledModel wraps the shared BedrockModel per review, routes every
+invocation through the scheduler and records the time spent waiting, which
+ends up in reviewMeta.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from strands.types.exceptions import ModelThrottledException
+from strands.types.models import Model
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# Per-model limits as JSON, e.g. {"us.anthropic.claude-3-7-sonnet-20250219-v1:0": {"rpm": 50, "tpm": 200000}}
+BEDROCK_RATE_LIMITS: Dict[str, Dict[str, float]] = json.loads(
+    os.environ.get("BEDROCK_RATE_LIMITS", "{}")
+)
+# Limits of models not listed above; 0 means unknown (learned from throttling)
+BEDROCK_DEFAULT_RPM = float(os.environ.get("BEDROCK_DEFAULT_RPM", "0"))
+BEDROCK_DEFAULT_TPM = float(os.environ.get("BEDROCK_DEFAULT_TPM", "0"))
+# Multiplicative decrease on throttling and additive increase (fraction of the
+# configured limit, or of the current one when unknown) per success
+BEDROCK_AIMD_DECREASE = float(os.environ.get("BEDROCK_AIMD_DECREASE", "0.5"))
+BEDROCK_AIMD_INCREASE = float(os.environ.get("BEDROCK_AIMD_INCREASE", "0.05"))
+# Optional file for sharing scheduler state between processes
+BEDROCK_SCHEDULER_STATE_FILE = os.environ.get("BEDROCK_SCHEDULER_STATE_FILE", "")
+
+# Floors of the effective limits, so one throttle cannot stall a review for minutes
+BEDROCK_MIN_RPM = float(os.environ.get("BEDROCK_MIN_RPM", "6"))
+BEDROCK_MIN_TPM = float(os.environ.get("BEDROCK_MIN_TPM", "20000"))
+
+WINDOW_SECONDS = 60.0
+# Rough characters-per-token ratio used to estimate input tokens up front
+CHARS_PER_TOKEN = 4
+
+
+class MemoryStateStore:
+    """Scheduler state shared by the threads of one process."""
+
+    def __init__(self):
+        self._state: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def transaction(self) -> Iterator[Dict[str, Any]]:
+        """Lock the state and yield it for reading and updating."""
+        with self._lock:
+            yield self._state
+
+
+class FileStateStore:
+    """Scheduler state shared by processes through a locked JSON file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def transaction(self) -> Iterator[Dict[str, Any]]:
+        """Lock the file, yield its state and write it back."""
+        with self._lock, open(f"{self.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(self.path, encoding="utf-8") as f:
+                        state = json.load(f)
+                except (FileNotFoundError, json.JSONDecodeError):
+                    state = {}
+                yield state
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(state, f)
+                os.replace(tmp_path, self.path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class BedrockScheduler:
+    """Token buckets with AIMD limits per Bedrock model ID."""
+
+    def __init__(
+        self,
+        store: Any = None,
+        rate_limits: Optional[Dict[str, Dict[str, float]]] = None,
+    ):
+        self.store = store or MemoryStateStore()
+        self.rate_limits = BEDROCK_RATE_LIMITS if rate_limits is None else rate_limits
+
+    def configured_limits(self, model_id: str) -> Dict[str, float]:
+        """Configured RPM/TPM of a model (0 = unknown)."""
+        limits = self.rate_limits.get(model_id, {})
+        return {
+            "rpm": float(limits.get("rpm", BEDROCK_DEFAULT_RPM)),
+            "tpm": float(limits.get("tpm", BEDROCK_DEFAULT_TPM)),
+        }
+
+    def _model_state(self, state: Dict[str, Any], model_id: str, now: float) -> Dict[str, Any]:
+        """Get (and refill) the bucket state of a model."""
+        entry = state.get(model_id)
+        if entry is None:
+            configured = self.configured_limits(model_id)
+            entry = {
+                "rpm_limit": configured["rpm"] or None,
+                "tpm_limit": configured["tpm"] or None,
+                "requests": configured["rpm"],
+                "tokens": configured["tpm"],
+                "updated": now,
+                "window": [],
+            }
+            state[model_id] = entry
+
+        elapsed = max(0.0, now - entry["updated"])
+        if entry["rpm_limit"]:
+            entry["requests"] = min(
+                entry["rpm_limit"],
+                entry["requests"] + elapsed * entry["rpm_limit"] / WINDOW_SECONDS,
+            )
+        if entry["tpm_limit"]:
+            entry["tokens"] = min(
+                entry["tpm_limit"],
+                entry["tokens"] + elapsed * entry["tpm_limit"] / WINDOW_SECONDS,
+            )
+        entry["updated"] = now
+        entry["window"] = [w for w in entry["window"] if now - w[0] < WINDOW_SECONDS]
+        return entry
+
+    def acquire(self, model_id: str, estimated_tokens: int) -> float:
+        """
+        Block until the model has capacity for one request.
+
+        Args:
+            model_id: Bedrock model ID
+            estimated_tokens: Estimated input + output tokens of the request
+
+        Returns:
+            Seconds spent waiting
+        """
+        started = time.monotonic()
+        while True:
+            now = time.time()
+            with self.store.transaction() as state:
+                entry = self._model_state(state, model_id, now)
+                # A single request larger than the bucket must still pass eventually
+                tokens_needed = min(estimated_tokens, entry["tpm_limit"] or estimated_tokens)
+                wait = 0.0
+                if entry["rpm_limit"] and entry["requests"] < 1:
+                    wait = max(
+                        wait,
+                        (1 - entry["requests"]) * WINDOW_SECONDS / entry["rpm_limit"],
+                    )
+                if entry["tpm_limit"] and entry["tokens"] < tokens_needed:
+                    wait = max(
+                        wait,
+                        (tokens_needed - entry["tokens"])
+                        * WINDOW_SECONDS
+                        / entry["tpm_limit"],
+                    )
+                if wait <= 0:
+                    if entry["rpm_limit"]:
+                        entry["requests"] -= 1
+                    if entry["tpm_limit"]:
+                        entry["tokens"] -= tokens_needed
+                    entry["window"].append([now, estimated_tokens])
+                    return time.monotonic() - started
+            time.sleep(min(wait, WINDOW_SECONDS))
+
+    def record_usage(self, model_id: str, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token bucket once the actual usage of a request is known."""
+        with self.store.transaction() as state:
+            entry = self._model_state(state, model_id, time.time())
+            if entry["tpm_limit"]:
+                entry["tokens"] -= actual_tokens - estimated_tokens
+            if entry["window"]:
+                entry["window"][-1][1] = actual_tokens
+
+    def on_success(self, model_id: str) -> None:
+        """Additive increase of the effective limits."""
+        with self.store.transaction() as state:
+            entry = self._model_state(state, model_id, time.time())
+            configured = self.configured_limits(model_id)
+            for key, minimum in (("rpm", BEDROCK_MIN_RPM), ("tpm", BEDROCK_MIN_TPM)):
+                limit = entry[f"{key}_limit"]
+                if limit is None:
+                    continue
+                step = BEDROCK_AIMD_INCREASE * (configured[key] or limit)
+                limit = max(minimum, limit + step)
+                entry[f"{key}_limit"] = min(limit, configured[key]) if configured[key] else limit
+
+    def on_throttle(self, model_id: str) -> None:
+        """Multiplicative decrease of the effective limits."""
+        with self.store.transaction() as state:
+            entry = self._model_state(state, model_id, time.time())
+            observed = {
+                "rpm": float(len(entry["window"])),
+                "tpm": float(sum(w[1] for w in entry["window"])),
+            }
+            for key, bucket, minimum in (
+                ("rpm", "requests", BEDROCK_MIN_RPM),
+                ("tpm", "tokens", BEDROCK_MIN_TPM),
+            ):
+                current = entry[f"{key}_limit"]
+                if current is None:
+                    # Unknown limits start below the rate that was just throttled
+                    limit = max(minimum, observed[key] * BEDROCK_AIMD_DECREASE)
+                    entry[bucket] = limit
+                else:
+                    limit = max(minimum, current * BEDROCK_AIMD_DECREASE)
+                # The strands retry backoff already pauses the throttled request
+                entry[f"{key}_limit"] = limit
+                entry[bucket] = min(entry[bucket], limit)
+            logger.warning(
+                f"[BedrockScheduler] Throttled on {model_id}; limits now "
+                f"rpm={entry['rpm_limit']:.1f} tpm={entry['tpm_limit']:.0f}"
+            )
+
+
+def estimate_tokens(request: Dict[str, Any]) -> int:
+    """Estimate the tokens of a Converse request from its text size."""
+    chars = len(json.dumps(request.get("messages", []), default=lambda _: ""))
+    chars += len(json.dumps(request.get("system", []), default=lambda _: ""))
+    max_tokens = (request.get("inferenceConfig") or {}).get("maxTokens", 0)
+    return chars // CHARS_PER_TOKEN + int(max_tokens or 0)
+
+
+class ScheduledModel(Model):
+    """
+    Per-review wrapper of a shared model that paces invocations.
+
+    Formatting is delegated to the wrapped model; stream() waits for
+    capacity, reports throttling to the scheduler and records statistics for
+    reviewMeta. A throttle is re-raised for the strands event loop to retry.
+    """
+
+    def __init__(self, model: Any, scheduler: "BedrockScheduler"):
+        self.model = model
+        self.scheduler = scheduler
+        self.model_id = model.get_config().get("model_id")
+        self.queue_wait_seconds = 0.0
+        self.requests = 0
+        self.throttles = 0
+        self.usage: Dict[str, int] = {}
+
+    @property
+    def config(self) -> Any:
+        """Configuration of the wrapped model (read by the strands event loop)."""
+        return self.model.config
+
+    def update_config(self, **model_config: Any) -> None:
+        """Update the configuration of the wrapped model."""
+        self.model.update_config(**model_config)
+
+    def get_config(self) -> Any:
+        """Configuration of the wrapped model."""
+        return self.model.get_config()
+
+    def format_request(
+        self,
+        messages: Any,
+        tool_specs: Optional[List[Any]] = None,
+        system_prompt: Optional[str] = None,
+    ) -> Any:
+        """Format a request with the wrapped model."""
+        return self.model.format_request(messages, tool_specs, system_prompt)
+
+    def format_chunk(self, event: Any) -> Any:
+        """Format a response event with the wrapped model."""
+        return self.model.format_chunk(event)
+
+    def stream(self, request: Any) -> Iterable[Any]:
+        """Invoke the wrapped model once the scheduler grants capacity."""
+        estimated = estimate_tokens(request)
+        self.queue_wait_seconds += self.scheduler.acquire(self.model_id, estimated)
+        self.requests += 1
+        try:
+            for event in self.model.stream(request):
+                self._observe(event, estimated)
+                yield event
+        except ModelThrottledException:
+            self.scheduler.on_throttle(self.model_id)
+            self.throttles += 1
+            raise
+        self.scheduler.on_success(self.model_id)
+
+    def _observe(self, event: Dict[str, Any], estimated: int) -> None:
+        """Record the usage reported in a metadata event."""
+        usage = (event.get("metadata") or {}).get("usage")
+        if not usage:
+            return
+        for key, value in usage.items():
+            if isinstance(value, (int, float)):
+                self.usage[key] = self.usage.get(key, 0) + int(value)
+        self.scheduler.record_usage(
+            self.model_id, estimated, int(usage.get("totalTokens", estimated))
+        )
+
+    def get_meta(self) -> Dict[str, Any]:
+        """Scheduling statistics for reviewMeta."""
+        return {
+            "requests": self.requests,
+            "queue_wait_seconds": round(self.queue_wait_seconds, 3),
+            "throttles": self.throttles,
+        }
+
+
+def _create_store() -> Any:
+    if BEDROCK_SCHEDULER_STATE_FILE:
+        return FileStateStore(BEDROCK_SCHEDULER_STATE_FILE)
+    return MemoryStateStore()
+
+
+# Shared by every review in the process
+bedrock_scheduler = BedrockScheduler(_create_store())
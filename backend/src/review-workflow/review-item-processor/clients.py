@@ -0,0 +1,113 @@
+"""
+Process-wide registry of AWS clients and Bedrock models.
+
+Creating a boto3 client or a BedrockModel resolves credentials and endpoints
+and opens a new connection pool. Lambda keeps module state alive across warm
+invocations, so the instances created here are reused until the container is
+recycled. Everything is created lazily on first use.
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import boto3
+from botocore.config import Config
+from strands.models import BedrockModel
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# Connection pool size of every boto3 client created here
+BOTO_MAX_POOL_CONNECTIONS = int(os.environ.get("BOTO_MAX_POOL_CONNECTIONS", "50"))
+
+_lock = threading.Lock()
+_clients: Dict[Tuple[str, Optional[str]], Any] = {}
+_models: Dict[Tuple[Any, ...], BedrockModel] = {}
+
+
+def _client_config() -> Config:
+    """botocore configuration shared by all clients."""
+    return Config(max_pool_connections=BOTO_MAX_POOL_CONNECTIONS)
+
+
+def get_boto3_client(service_name: str, region_name: Optional[str] = None) -> Any:
+    """
+    Get a shared boto3 client, creating it on first use.
+
+    boto3 clients are thread-safe once created; only their creation is
+    serialized here.
+
+    Args:
+        service_name: AWS service name (e.g. "s3")
+        region_name: AWS region, or None for the default region
+
+    Returns:
+        boto3 client
+    """
+    key = (service_name, region_name)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            logger.debug(f"Creating boto3 client: {service_name} ({region_name})")
+            client = boto3.client(
+                service_name, region_name=region_name, config=_client_config()
+            )
+            _clients[key] = client
+    return client
+
+
+def get_bedrock_model(
+    model_id: str,
+    region_name: str,
+    temperature: float = 0.0,
+    cache_prompt: Optional[str] = None,
+    cache_tools: Optional[str] = None,
+) -> BedrockModel:
+    """
+    Get a shared BedrockModel for the given configuration.
+
+    A BedrockModel only holds its configuration and a bedrock-runtime client,
+    so one instance can serve any number of agents, including concurrent ones.
+
+    Args:
+        model_id: Bedrock model ID
+        region_name: Bedrock region
+        temperature: Temperature setting for the model
+        cache_prompt: Cache point type for the system prompt, if any
+        cache_tools: Cache point type for tool definitions, if any
+
+    Returns:
+        BedrockModel instance
+    """
+    key = (model_id, region_name, temperature, cache_prompt, cache_tools)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            logger.debug(f"Creating BedrockModel: {key}")
+            bedrock_config: Dict[str, Any] = {
+                "model_id": model_id,
+                "temperature": temperature,
+                "streaming": False,  # Always disable streaming since this app doesn't use streaming
+            }
+            if cache_prompt:
+                bedrock_config["cache_prompt"] = cache_prompt
+            if cache_tools:
+                bedrock_config["cache_tools"] = cache_tools
+
+            model = BedrockModel(
+                region_name=region_name,
+                boto_client_config=_client_config(),
+                **bedrock_config,
+            )
+            _models[key] = model
+    return model
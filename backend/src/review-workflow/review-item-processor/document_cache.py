@@ -0,0 +1,164 @@
+"""
+On-disk cache of review documents downloaded from S3.
+
+Lambda keeps /tmp for the lifetime of a warm container, so documents that are
+reviewed again (e.g. the next check item of the same review job) can be served
+locally instead of being downloaded again.
+
+Entries are keyed by bucket/key/ETag. Every fetch issues a HEAD request, so an
+object that was overwritten in S3 gets a new ETag and therefore a new entry.
+Entries are hard-linked into the per-review working directory, which keeps the
+existing cleanup of that directory correct: removing the link never removes the
+cached copy, and evicting the cached copy never breaks a review in progress.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import uuid
+from typing import Any, Dict, Optional
+
+from boto3.s3.transfer import TransferConfig
+from utils import tmp_cache_budget
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+DOCUMENT_CACHE_DIR = os.environ.get("DOCUMENT_CACHE_DIR", "/tmp/document_cache")
+# Byte budget of the cache (default: 40% of /tmp). 0 disables caching.
+DOCUMENT_CACHE_SIZE_LIMIT = tmp_cache_budget(
+    float(os.environ.get("DOCUMENT_CACHE_TMP_SHARE", "0.4")),
+    os.environ.get("DOCUMENT_CACHE_SIZE_LIMIT"),
+)
+
+PARTIAL_SUFFIX = ".part"
+
+
+class DocumentCache:
+    """Content-addressed LRU cache of S3 objects under /tmp."""
+
+    def __init__(
+        self,
+        cache_dir: str = DOCUMENT_CACHE_DIR,
+        size_limit: int = DOCUMENT_CACHE_SIZE_LIMIT,
+    ):
+        self.cache_dir = cache_dir
+        self.size_limit = size_limit
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether documents are cached at all."""
+        return self.size_limit > 0
+
+    def fetch(
+        self,
+        s3_client: Any,
+        bucket: str,
+        key: str,
+        dest_path: str,
+        transfer_config: Optional[TransferConfig] = None,
+    ) -> Dict[str, Any]:
+        """
+        Place the S3 object at dest_path, downloading it only on a cache miss.
+
+        Args:
+            s3_client: boto3 S3 client
+            bucket: S3 bucket of the object
+            key: S3 key of the object
+            dest_path: Local path the object should appear at
+            transfer_config: Transfer settings (multipart threshold, chunk size)
+                used for downloads
+
+        Returns:
+            Dictionary with "cache_hit", "bytes" and "etag"
+        """
+        if not self.enabled:
+            s3_client.download_file(bucket, key, dest_path, Config=transfer_config)
+            return {
+                "cache_hit": False,
+                "bytes": os.path.getsize(dest_path),
+                "etag": None,
+            }
+
+        # HEAD revalidation: the ETag changes whenever the object is overwritten
+        head = s3_client.head_object(Bucket=bucket, Key=key)
+        etag = head["ETag"].strip('"')
+        size = head["ContentLength"]
+        entry_path = self._entry_path(bucket, key, etag)
+
+        if os.path.exists(entry_path):
+            logger.debug(f"[DocumentCache] Hit for s3://{bucket}/{key} ({etag})")
+            # Refresh mtime so that eviction treats the entry as recently used
+            os.utime(entry_path)
+            self._link(entry_path, dest_path)
+            return {"cache_hit": True, "bytes": size, "etag": etag}
+
+        if size > self.size_limit:
+            logger.info(
+                f"[DocumentCache] s3://{bucket}/{key} ({size} bytes) exceeds the cache budget, downloading without caching"
+            )
+            s3_client.download_file(bucket, key, dest_path, Config=transfer_config)
+            return {"cache_hit": False, "bytes": size, "etag": etag}
+
+        logger.debug(f"[DocumentCache] Miss for s3://{bucket}/{key} ({etag})")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        partial_path = f"{entry_path}.{uuid.uuid4().hex}{PARTIAL_SUFFIX}"
+        try:
+            s3_client.download_file(
+                bucket, key, partial_path, Config=transfer_config
+            )
+            # Atomic publish so concurrent readers never see a partial file
+            os.replace(partial_path, entry_path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+        self._link(entry_path, dest_path)
+        self._evict(keep=entry_path)
+        return {"cache_hit": False, "bytes": size, "etag": etag}
+
+    def _entry_path(self, bucket: str, key: str, etag: str) -> str:
+        """Path of the cache entry for the given object version."""
+        digest = hashlib.sha256(f"{bucket}/{key}/{etag}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest)
+
+    def _link(self, entry_path: str, dest_path: str) -> None:
+        """Hard-link a cache entry into a working directory, copying as fallback."""
+        try:
+            os.link(entry_path, dest_path)
+        except OSError:
+            shutil.copyfile(entry_path, dest_path)
+
+    def _evict(self, keep: str) -> None:
+        """Remove least recently used entries until the cache fits its budget."""
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(PARTIAL_SUFFIX):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+
+            if total <= self.size_limit:
+                return
+
+            for _, size, path in sorted(entries):
+                if total <= self.size_limit:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                    total -= size
+                    logger.debug(f"[DocumentCache] Evicted {path} ({size} bytes)")
+                except FileNotFoundError:
+                    pass
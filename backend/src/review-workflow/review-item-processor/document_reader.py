@@ -0,0 +1,320 @@
+"""
+Paged, memory-bounded reader tool for review documents.
+
+`file_read` loads a whole file into memory and returns it whole. On a
+1 GB Lambda, a large scanned PDF exceeds both the memory and the token
+limits. The `read_document` tool lets the agent request only the parts it
+needs:
+
+- "info" returns the page count;
+- "read" returns a range of pages;
+- "search" returns the pages that contain some text.
+
+The downloaded file is memory-mapped, so the operating system only pages in
+the parts that are read:
+
+- Page-marked text files (see document_text) are split at their
+  "--- Page N ---" markers.
+- Other text files are split into fixed-size chunks.
+- PDFs are read lazily by pypdf from the mapping. A page without a text
+  layer is returned as a small PDF of only the requested pages.
+"""
+
+import io
+import logging
+import mmap
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from document_text import PDF_FILE_EXTENSIONS, TEXT_FILE_EXTENSIONS
+from strands import tool
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# Maximum number of pages returned by one "read" call
+DOCUMENT_READER_MAX_PAGES = int(os.environ.get("DOCUMENT_READER_MAX_PAGES", "10"))
+# Maximum number of characters returned by one call
+DOCUMENT_READER_MAX_CHARS = int(os.environ.get("DOCUMENT_READER_MAX_CHARS", "60000"))
+# Maximum number of matches returned by one "search" call
+DOCUMENT_READER_MAX_MATCHES = int(os.environ.get("DOCUMENT_READER_MAX_MATCHES", "20"))
+# Size of a page of text files without page markers
+DOCUMENT_READER_TEXT_PAGE_BYTES = int(
+    os.environ.get("DOCUMENT_READER_TEXT_PAGE_BYTES", str(16 * 1024))
+)
+# Documents above this size are only offered through read_document
+DOCUMENT_READER_FULL_READ_LIMIT = int(
+    os.environ.get("DOCUMENT_READER_FULL_READ_LIMIT", str(1024 * 1024))
+)  # 1 MB
+
+PAGE_MARKER_PATTERN = re.compile(rb"^--- Page (\d+) ---\r?$", re.MULTILINE)
+SNIPPET_CHARS = 120
+
+
+class PagedDocument:
+    """Page-level access to a memory-mapped document."""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Local path of a PDF or text document
+        """
+        self.path = path
+        ext = os.path.splitext(path)[1].lower()
+        if ext not in PDF_FILE_EXTENSIONS and ext not in TEXT_FILE_EXTENSIONS:
+            raise ValueError(f"Unsupported document type: {ext}")
+
+        self._file = open(path, "rb")
+        self._mmap: Optional[mmap.mmap] = None
+        self._reader: Any = None
+        # (page number, start offset, end offset) of text documents
+        self._pages: List[Tuple[int, int, int]] = []
+        if os.fstat(self._file.fileno()).st_size == 0:
+            return
+
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if ext in PDF_FILE_EXTENSIONS:
+            # Imported lazily: only needed for PDFs without extracted text
+            from pypdf import PdfReader
+
+            self._reader = PdfReader(self._mmap)
+        else:
+            self._pages = self._text_pages(self._mmap)
+
+    def __enter__(self) -> "PagedDocument":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the mapping and the file."""
+        self._reader = None
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    @property
+    def page_count(self) -> int:
+        """Number of pages."""
+        if self._reader is not None:
+            return len(self._reader.pages)
+        return len(self._pages)
+
+    @staticmethod
+    def _text_pages(data: mmap.mmap) -> List[Tuple[int, int, int]]:
+        """Page boundaries of a text file (markers, or fixed-size chunks)."""
+        markers = list(PAGE_MARKER_PATTERN.finditer(data))
+        if markers:
+            # A page runs from its marker to the marker of the next page
+            return [
+                (
+                    int(m.group(1)),
+                    m.end(),
+                    markers[i + 1].start() if i + 1 < len(markers) else len(data),
+                )
+                for i, m in enumerate(markers)
+            ]
+
+        pages = []
+        start = 0
+        while start < len(data):
+            end = min(len(data), start + DOCUMENT_READER_TEXT_PAGE_BYTES)
+            if end < len(data):
+                # Break at a line end so that lines and characters stay whole
+                newline = data.rfind(b"\n", start, end)
+                end = newline + 1 if newline > start else end
+            pages.append((len(pages) + 1, start, end))
+            start = end
+        return pages
+
+    def _page_position(self, page_number: int) -> int:
+        """Position of a page number in the document."""
+        if self._reader is not None:
+            return page_number - 1
+        for position, (number, _, _) in enumerate(self._pages):
+            if number == page_number:
+                return position
+        return -1
+
+    def page_numbers(self) -> List[int]:
+        """Page numbers in document order."""
+        if self._reader is not None:
+            return list(range(1, self.page_count + 1))
+        return [number for number, _, _ in self._pages]
+
+    def page_text(self, position: int) -> str:
+        """Text of the page at a position."""
+        if self._reader is not None:
+            return (self._reader.pages[position].extract_text() or "").strip()
+        _, start, end = self._pages[position]
+        return self._mmap[start:end].decode("utf-8", errors="replace").strip()
+
+    def read_pages(self, start_page: int, end_page: int) -> List[Dict[str, Any]]:
+        """
+        Read a range of pages.
+
+        Args:
+            start_page: First page number
+            end_page: Last page number (inclusive)
+
+        Returns:
+            [{"page": <page number>, "text": <page text>}, ...]
+        """
+        numbers = [n for n in self.page_numbers() if start_page <= n <= end_page]
+        return [
+            {"page": n, "text": self.page_text(self._page_position(n))}
+            for n in numbers
+        ]
+
+    def search(self, query: str, max_matches: int) -> List[Dict[str, Any]]:
+        """
+        Find the pages that contain a text (case-insensitive).
+
+        Args:
+            query: Text to search for
+            max_matches: Maximum number of matches to return
+
+        Returns:
+            [{"page": <page number>, "snippet": <text around the match>}, ...]
+        """
+        pattern = re.compile(re.escape(query), re.IGNORECASE)
+        matches = []
+        for position, number in enumerate(self.page_numbers()):
+            text = self.page_text(position)
+            for m in pattern.finditer(text):
+                snippet = text[
+                    max(0, m.start() - SNIPPET_CHARS) : m.end() + SNIPPET_CHARS
+                ]
+                matches.append({"page": number, "snippet": " ".join(snippet.split())})
+                if len(matches) >= max_matches:
+                    return matches
+        return matches
+
+    def pdf_pages(self, start_page: int, end_page: int) -> bytes:
+        """
+        Copy a range of pages of a PDF into a new, smaller PDF.
+
+        Args:
+            start_page: First page number
+            end_page: Last page number (inclusive)
+
+        Returns:
+            PDF bytes
+        """
+        from pypdf import PdfWriter
+
+        writer = PdfWriter()
+        for position in range(start_page - 1, min(end_page, self.page_count)):
+            writer.add_page(self._reader.pages[position])
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        return buffer.getvalue()
+
+    @property
+    def is_pdf(self) -> bool:
+        """Whether the document is read with pypdf."""
+        return self._reader is not None
+
+
+def needs_paged_reading(file_paths: List[str]) -> bool:
+    """Whether any document is too large to be read whole with file_read."""
+    return any(
+        os.path.exists(path) and os.path.getsize(path) > DOCUMENT_READER_FULL_READ_LIMIT
+        for path in file_paths
+    )
+
+
+@tool
+def read_document(
+    path: str,
+    action: str = "info",
+    start_page: int = 1,
+    end_page: int = 0,
+    query: str = "",
+) -> Dict[str, Any]:
+    """
+    Read a review document page by page instead of loading the whole file.
+
+    Use "info" first to get the page count, then "read" the pages you need
+    or "search" for the pages that mention a term.
+
+    Args:
+        path: Path of the document, exactly as listed in the prompt
+        action: "info" (page count), "read" (pages start_page to end_page)
+            or "search" (pages containing query)
+        start_page: First page to read, starting from 1
+        end_page: Last page to read; defaults to start_page. At most 10
+            pages are returned per call
+        query: Text to search for (case-insensitive), for "search"
+
+    Returns:
+        Tool result with the requested pages, each starting with its
+        "--- Page N ---" marker
+    """
+    if not os.path.isfile(path):
+        raise ValueError(f"No such document: {path}")
+
+    with PagedDocument(path) as document:
+        if action == "info":
+            numbers = document.page_numbers()
+            text = f"{os.path.basename(path)}: {document.page_count} pages"
+            if numbers:
+                text += f" (pages {numbers[0]}-{numbers[-1]})"
+            return {"status": "success", "content": [{"text": text}]}
+
+        if action == "search":
+            if not query.strip():
+                raise ValueError("query is required for action 'search'")
+            matches = document.search(query, DOCUMENT_READER_MAX_MATCHES)
+            if not matches:
+                text = f"No page contains '{query}'"
+            else:
+                text = "\n".join(f"Page {m['page']}: {m['snippet']}" for m in matches)
+            return {"status": "success", "content": [{"text": text}]}
+
+        if action != "read":
+            raise ValueError(f"Unknown action '{action}'; use info, read or search")
+
+        end_page = max(start_page, end_page or start_page)
+        end_page = min(end_page, start_page + DOCUMENT_READER_MAX_PAGES - 1)
+        pages = document.read_pages(start_page, end_page)
+        if not pages:
+            raise ValueError(
+                f"No pages in range {start_page}-{end_page} "
+                f"(the document has {document.page_count} pages)"
+            )
+
+        if document.is_pdf and not any(page["text"] for page in pages):
+            # Scanned pages: hand over the pages themselves
+            logger.debug(f"Returning pages {start_page}-{end_page} of {path} as PDF")
+            name = re.sub(r"[^A-Za-z0-9-]", "-", os.path.splitext(os.path.basename(path))[0])
+            return {
+                "status": "success",
+                "content": [
+                    {"text": f"Pages {start_page}-{end_page} have no text layer:"},
+                    {
+                        "document": {
+                            "format": "pdf",
+                            "name": f"{name}-p{start_page}-{end_page}",
+                            "source": {
+                                "bytes": document.pdf_pages(start_page, end_page)
+                            },
+                        }
+                    },
+                ],
+            }
+
+        parts = []
+        length = 0
+        for page in pages:
+            part = f"--- Page {page['page']} ---\n{page['text']}"
+            if parts and length + len(part) > DOCUMENT_READER_MAX_CHARS:
+                parts.append(
+                    f"[Stopped before page {page['page']}: output limit reached]"
+                )
+                break
+            parts.append(part[:DOCUMENT_READER_MAX_CHARS])
+            length += len(part)
+        return {"status": "success", "content": [{"text": "\n\n".join(parts)}]}
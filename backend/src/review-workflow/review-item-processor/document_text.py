@@ -0,0 +1,280 @@
+"""
+One-time, page-indexed text extraction of review documents.
+
+Without this, every check of a review job had the agent open the raw PDF, so
+the same document was parsed and tokenized again for each of dozens of checks.
+The text of each document version is now extracted once and stored as a
+compact artifact
+
+    {"version": 1, "source": {...}, "pages": [{"page": 1, "text": "..."}, ...]}
+
+in a local /tmp cache and, optionally, gzipped in S3 (shared by all
+containers). Artifacts are keyed by bucket/key/ETag, or by the content hash
+when the ETag is unknown.
+
+The agent is given a rendered text file instead of the binary, in which every
+page starts with a "--- Page N ---" marker, so the pageNumber of a result can
+be taken from the text instead of being guessed. Pages without a text layer
+(scanned pages of a mixed PDF) point the agent to the original file, which
+read_document returns page by page.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Any, Dict, List, Optional
+
+from utils import tmp_cache_budget
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+DOCUMENT_TEXT_CACHE_DIR = os.environ.get("DOCUMENT_TEXT_CACHE_DIR", "/tmp/document_text")
+# Byte budget of the local artifact cache (default: 5% of /tmp)
+DOCUMENT_TEXT_CACHE_SIZE_LIMIT = tmp_cache_budget(
+    float(os.environ.get("DOCUMENT_TEXT_CACHE_TMP_SHARE", "0.05")),
+    os.environ.get("DOCUMENT_TEXT_CACHE_SIZE_LIMIT"),
+)
+# Optional shared tier; defaults to the temp bucket, empty disables it
+DOCUMENT_TEXT_BUCKET = os.environ.get(
+    "DOCUMENT_TEXT_BUCKET", os.environ.get("TEMP_BUCKET", "")
+)
+# Under temp/ so that the temp bucket's expiration rule removes the artifacts
+DOCUMENT_TEXT_PREFIX = os.environ.get("DOCUMENT_TEXT_PREFIX", "temp/document-text/")
+
+# Bump when the extraction output changes so that old artifacts are ignored
+EXTRACTION_VERSION = 1
+PAGE_MARKER = "--- Page {page} ---"
+EMPTY_PAGE_NOTE = (
+    "[This page has no text layer. Read page {page} of {path} with the "
+    "read_document tool to see the page itself.]"
+)
+PDF_FILE_EXTENSIONS = [".pdf"]
+TEXT_FILE_EXTENSIONS = [".txt", ".md", ".csv", ".html", ".htm", ".json", ".xml"]
+PARTIAL_SUFFIX = ".part"
+
+
+def supports_extraction(file_path: str) -> bool:
+    """Whether text can be extracted from the file."""
+    ext = os.path.splitext(file_path)[1].lower()
+    return ext in PDF_FILE_EXTENSIONS or ext in TEXT_FILE_EXTENSIONS
+
+
+def extract_pages(file_path: str) -> List[Dict[str, Any]]:
+    """
+    Extract the text of every page of a document.
+
+    Args:
+        file_path: Local path of a PDF or plain-text document
+
+    Returns:
+        [{"page": <1-based page number>, "text": <page text>}, ...]; text
+        formats are a single page
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in PDF_FILE_EXTENSIONS:
+        # Imported lazily: only needed when extracting on a cache miss
+        from pypdf import PdfReader
+
+        reader = PdfReader(file_path)
+        return [
+            {"page": number, "text": (page.extract_text() or "").strip()}
+            for number, page in enumerate(reader.pages, start=1)
+        ]
+
+    with open(file_path, encoding="utf-8", errors="replace") as f:
+        return [{"page": 1, "text": f.read()}]
+
+
+def render_pages(artifact: Dict[str, Any], original_path: Optional[str] = None) -> str:
+    """
+    Render an artifact as text with a marker in front of every page.
+
+    Args:
+        artifact: Text artifact (or {"pages": [...]})
+        original_path: Local path of the original document; pages without
+            text then refer to it
+
+    Returns:
+        Page-marked text
+    """
+    parts = []
+    for page in artifact["pages"]:
+        text = page["text"]
+        if original_path and not text.strip():
+            text = EMPTY_PAGE_NOTE.format(page=page["page"], path=original_path)
+        parts.append(f"{PAGE_MARKER.format(page=page['page'])}\n{text}")
+    return "\n\n".join(parts)
+
+
+class DocumentTextStore:
+    """Local + S3 cache of page-indexed text artifacts."""
+
+    def __init__(
+        self,
+        cache_dir: str = DOCUMENT_TEXT_CACHE_DIR,
+        size_limit: int = DOCUMENT_TEXT_CACHE_SIZE_LIMIT,
+        bucket_name: str = DOCUMENT_TEXT_BUCKET,
+        key_prefix: str = DOCUMENT_TEXT_PREFIX,
+    ):
+        self.cache_dir = cache_dir
+        self.size_limit = size_limit
+        self.bucket_name = bucket_name
+        self.key_prefix = key_prefix
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def artifact_key(
+        bucket: str, key: str, etag: Optional[str], file_path: str
+    ) -> str:
+        """Identity of a document version (content hash if the ETag is unknown)."""
+        if etag:
+            source = f"{bucket}/{key}/{etag}"
+        else:
+            digest = hashlib.sha256()
+            with open(file_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            source = f"sha256:{digest.hexdigest()}"
+        return hashlib.sha256(
+            f"v{EXTRACTION_VERSION}/{source}".encode("utf-8")
+        ).hexdigest()
+
+    def get_or_extract(
+        self,
+        s3_client: Any,
+        bucket: str,
+        key: str,
+        etag: Optional[str],
+        file_path: str,
+    ) -> Dict[str, Any]:
+        """
+        Get the text artifact of a document, extracting it on a cache miss.
+
+        Args:
+            s3_client: boto3 S3 client (for the shared tier)
+            bucket: S3 bucket of the document
+            key: S3 key of the document
+            etag: ETag of the document version, if known
+            file_path: Local copy of the document
+
+        Returns:
+            Artifact dictionary with added "key" (artifact key) and "cache"
+            ("local", "s3" or "miss") fields
+        """
+        artifact_key = self.artifact_key(bucket, key, etag, file_path)
+
+        artifact = self._get_local(artifact_key)
+        if artifact is not None:
+            return {**artifact, "key": artifact_key, "cache": "local"}
+
+        artifact = self._get_shared(s3_client, artifact_key)
+        if artifact is not None:
+            self._put_local(artifact_key, artifact)
+            return {**artifact, "key": artifact_key, "cache": "s3"}
+
+        logger.info(f"[DocumentText] Extracting text of s3://{bucket}/{key}")
+        artifact = {
+            "version": EXTRACTION_VERSION,
+            "source": {"bucket": bucket, "key": key, "etag": etag},
+            "pages": extract_pages(file_path),
+        }
+        self._put_local(artifact_key, artifact)
+        self._put_shared(s3_client, artifact_key, artifact)
+        return {**artifact, "key": artifact_key, "cache": "miss"}
+
+    def _local_path(self, artifact_key: str) -> str:
+        return os.path.join(self.cache_dir, f"{artifact_key}.json.gz")
+
+    def _get_local(self, artifact_key: str) -> Optional[Dict[str, Any]]:
+        """Read an artifact from /tmp."""
+        path = self._local_path(artifact_key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                artifact = json.load(f)
+            os.utime(path)
+            return artifact
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"[DocumentText] Ignoring unreadable artifact {path}: {e}")
+            return None
+
+    def _put_local(self, artifact_key: str, artifact: Dict[str, Any]) -> None:
+        """Write an artifact to /tmp and keep the directory within its budget."""
+        if self.size_limit <= 0:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._local_path(artifact_key)
+        partial_path = f"{path}.{uuid.uuid4().hex}{PARTIAL_SUFFIX}"
+        try:
+            with gzip.open(partial_path, "wt", encoding="utf-8") as f:
+                json.dump(artifact, f, ensure_ascii=False)
+            os.replace(partial_path, path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        self._evict(keep=path)
+
+    def _get_shared(self, s3_client: Any, artifact_key: str) -> Optional[Dict[str, Any]]:
+        """Read an artifact from the S3 tier."""
+        if not self.bucket_name:
+            return None
+        try:
+            response = s3_client.get_object(
+                Bucket=self.bucket_name, Key=f"{self.key_prefix}{artifact_key}.json.gz"
+            )
+            return json.loads(gzip.decompress(response["Body"].read()).decode("utf-8"))
+        except Exception as e:
+            logger.debug(f"[DocumentText] No shared artifact {artifact_key}: {e}")
+            return None
+
+    def _put_shared(
+        self, s3_client: Any, artifact_key: str, artifact: Dict[str, Any]
+    ) -> None:
+        """Write an artifact to the S3 tier."""
+        if not self.bucket_name:
+            return
+        try:
+            s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=f"{self.key_prefix}{artifact_key}.json.gz",
+                Body=gzip.compress(
+                    json.dumps(artifact, ensure_ascii=False).encode("utf-8")
+                ),
+                ContentType="application/json",
+                ContentEncoding="gzip",
+            )
+        except Exception as e:
+            logger.warning(f"[DocumentText] Failed to store shared artifact {artifact_key}: {e}")
+
+    def _evict(self, keep: str) -> None:
+        """Remove least recently used artifacts until the cache fits its budget."""
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(PARTIAL_SUFFIX):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+
+            for _, size, path in sorted(entries):
+                if total <= self.size_limit:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,195 @@
+"""
+Collapsing of near-identical images in a review set.
+
+Users often upload the same page photographed twice, or the same image as
+both PNG and JPEG. Image reviews are the most expensive review type, and
+the model looked at every copy. Before the agent runs, duplicates are found
+in two steps:
+
+1. A difference hash (dHash) of every image picks out candidate copies:
+   images with a similar aspect ratio whose hashes differ in at most
+   IMAGE_DEDUPE_MAX_DISTANCE bits.
+2. Each candidate is compared with the kept image at full resolution, block
+   by block, and is only treated as a copy if no 8x8 block differs by more
+   than IMAGE_DEDUPE_MAX_BLOCK_DIFFERENCE.
+
+A hash alone cannot tell apart two forms printed from the same template
+that differ in a single filled-in digit; the block comparison can.
+
+Only the first copy is given to the agent. The index map (see
+image_normalizer) records the collapsed copies. remap_image_indexes() then
+re-expands usedImageIndexes to every original file the kept image stands
+for.
+"""
+
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from image_normalizer import NORMALIZED_FILE_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+IMAGE_DEDUPE_ENABLED = os.environ.get("IMAGE_DEDUPE_ENABLED", "true").lower() == "true"
+# Hash grid size; the hash has HASH_SIZE * HASH_SIZE bits
+IMAGE_DEDUPE_HASH_SIZE = int(os.environ.get("IMAGE_DEDUPE_HASH_SIZE", "16"))
+# Maximum number of differing hash bits between two candidate copies
+IMAGE_DEDUPE_MAX_DISTANCE = int(os.environ.get("IMAGE_DEDUPE_MAX_DISTANCE", "32"))
+# Maximum mean difference (0-255) of any 8x8 block between two copies
+IMAGE_DEDUPE_MAX_BLOCK_DIFFERENCE = int(
+    os.environ.get("IMAGE_DEDUPE_MAX_BLOCK_DIFFERENCE", "10")
+)
+# Maximum relative difference of the aspect ratios of two copies
+IMAGE_DEDUPE_MAX_ASPECT_DIFFERENCE = 0.05
+COMPARISON_BLOCK_SIZE = 8
+
+
+def perceptual_hash(file_path: str, hash_size: int = IMAGE_DEDUPE_HASH_SIZE) -> Tuple[int, float]:
+    """
+    Compute the difference hash of an image.
+
+    Args:
+        file_path: Local path of the image
+        hash_size: Size of the hash grid
+
+    Returns:
+        Tuple of (hash, aspect ratio width / height)
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(file_path) as image:
+        image.draft("L", (hash_size * 4, hash_size * 4))
+        image = ImageOps.exif_transpose(image)
+        aspect = image.width / image.height
+        grid = image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+        pixels = list(grid.getdata())
+
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return bits, aspect
+
+
+def is_candidate(a: Tuple[int, float], b: Tuple[int, float]) -> bool:
+    """Whether two (hash, aspect ratio) pairs may describe copies of one image."""
+    if abs(a[1] - b[1]) > IMAGE_DEDUPE_MAX_ASPECT_DIFFERENCE * max(a[1], b[1]):
+        return False
+    return (a[0] ^ b[0]).bit_count() <= IMAGE_DEDUPE_MAX_DISTANCE
+
+
+def max_block_difference(path_a: str, path_b: str) -> int:
+    """
+    Compare two images block by block at the smaller one's resolution.
+
+    Args:
+        path_a: Local path of the first image
+        path_b: Local path of the second image
+
+    Returns:
+        Largest mean absolute difference (0-255) of any 8x8 block
+    """
+    from PIL import Image, ImageChops, ImageOps
+
+    images = []
+    for path in (path_a, path_b):
+        with Image.open(path) as image:
+            images.append(ImageOps.exif_transpose(image).convert("L"))
+    a, b = images
+    size = min(a.size, b.size, key=lambda s: s[0] * s[1])
+    a = a if a.size == size else a.resize(size, Image.LANCZOS)
+    b = b if b.size == size else b.resize(size, Image.LANCZOS)
+    blocks = (
+        max(1, size[0] // COMPARISON_BLOCK_SIZE),
+        max(1, size[1] // COMPARISON_BLOCK_SIZE),
+    )
+    return ImageChops.difference(a, b).resize(blocks, Image.BOX).getextrema()[1]
+
+
+def is_duplicate(path_a: str, path_b: str) -> bool:
+    """Whether two candidate images are copies of each other."""
+    try:
+        return max_block_difference(path_a, path_b) <= IMAGE_DEDUPE_MAX_BLOCK_DIFFERENCE
+    except Exception as e:
+        logger.warning(f"[ImageDedupe] Cannot compare {path_a} and {path_b}: {e}")
+        return False
+
+
+def dedupe_images(
+    file_paths: List[str],
+    index_map: Optional[List[Dict[str, Any]]] = None,
+) -> Tuple[List[str], List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Drop near-identical copies of images from a review set.
+
+    Args:
+        file_paths: File paths prepared for the agent
+        index_map: Index map of file_paths (see normalize_images); None if
+            the paths are the downloaded files themselves
+
+    Returns:
+        Tuple of (file paths to give to the agent; index map of the returned
+        paths, where a kept image lists its collapsed copies under
+        "duplicates"; dedupe metadata for reviewMeta)
+    """
+    started = time.time()
+    if index_map is None:
+        index_map = [{"index": i, "page": None} for i in range(len(file_paths))]
+
+    kept_paths: List[str] = []
+    kept_map: List[Dict[str, Any]] = []
+    # (hash, aspect ratio) of the kept images, by position in kept_paths
+    kept_hashes: Dict[int, Tuple[int, float]] = {}
+    collapsed = []
+
+    for file_path, entry in zip(file_paths, index_map):
+        ext = os.path.splitext(file_path)[1].lower()
+        fingerprint = None
+        if ext in NORMALIZED_FILE_EXTENSIONS:
+            try:
+                fingerprint = perceptual_hash(file_path)
+            except Exception as e:
+                logger.warning(f"[ImageDedupe] Cannot hash {file_path}: {e}")
+
+        if fingerprint is not None:
+            original = next(
+                (
+                    position
+                    for position, kept in kept_hashes.items()
+                    if is_candidate(fingerprint, kept)
+                    and is_duplicate(file_path, kept_paths[position])
+                ),
+                None,
+            )
+            if original is not None:
+                target = kept_map[original]
+                duplicates = [{"index": entry["index"], "page": entry["page"]}]
+                target["duplicates"] = (
+                    target.get("duplicates", []) + duplicates + entry.get("duplicates", [])
+                )
+                collapsed.append(
+                    {
+                        "file": os.path.basename(file_path),
+                        "duplicate_of": os.path.basename(kept_paths[original]),
+                    }
+                )
+                continue
+            kept_hashes[len(kept_paths)] = fingerprint
+
+        kept_paths.append(file_path)
+        kept_map.append(dict(entry))
+
+    meta = {
+        "duration_seconds": round(time.time() - started, 3),
+        "images_in": len(file_paths),
+        "images_out": len(kept_paths),
+        "collapsed": collapsed,
+    }
+    if collapsed:
+        logger.info(
+            f"[ImageDedupe] Collapsed {len(collapsed)} near-duplicate images: {collapsed}"
+        )
+    return kept_paths, kept_map, meta
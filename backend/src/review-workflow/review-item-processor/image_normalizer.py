@@ -0,0 +1,420 @@
+"""
+Normalization of review images before they reach the model.
+
+Uploaded images are often 20-megapixel phone photos, multi-page TIFF scans
+or BMPs. They used to be passed to the model unchanged, but Bedrock accepts
+only JPEG, PNG, GIF and WebP, and downscales anything above the model's
+effective resolution anyway. Before an image review, every image is:
+
+- rotated upright according to its EXIF orientation;
+- split into pages if it is a multi-page TIFF;
+- converted to JPEG (photos) or PNG (scans, graphics, transparency);
+- downscaled to IMAGE_MAX_LONG_EDGE / IMAGE_MAX_MEGAPIXELS and kept within
+  the Bedrock per-image size limit;
+- stripped of its metadata.
+
+The output is cached under /tmp by content hash. Because pages are split,
+the model's image indexes no longer match the uploaded files.
+normalize_images() therefore also returns an index map, and
+remap_image_indexes() translates usedImageIndexes and boundingBoxes back
+to the original files.
+
+Bounding boxes use a 0-1000 scale relative to the image, so they remain
+valid after downscaling.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils import tmp_cache_budget
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+IMAGE_NORMALIZATION_ENABLED = (
+    os.environ.get("IMAGE_NORMALIZATION_ENABLED", "true").lower() == "true"
+)
+# Longest edge after downscaling (the effective maximum of the Claude models)
+IMAGE_MAX_LONG_EDGE = int(os.environ.get("IMAGE_MAX_LONG_EDGE", "1568"))
+# Pixel budget after downscaling
+IMAGE_MAX_MEGAPIXELS = float(os.environ.get("IMAGE_MAX_MEGAPIXELS", "1.15"))
+IMAGE_JPEG_QUALITY = int(os.environ.get("IMAGE_JPEG_QUALITY", "85"))
+# Pages taken from a multi-page TIFF (Bedrock accepts 20 images per request)
+IMAGE_MAX_PAGES = int(os.environ.get("IMAGE_MAX_PAGES", "20"))
+IMAGE_CACHE_DIR = os.environ.get("IMAGE_CACHE_DIR", "/tmp/image_cache")
+# Byte budget of the normalized image cache (default: 15% of /tmp)
+IMAGE_CACHE_SIZE_LIMIT = tmp_cache_budget(
+    float(os.environ.get("IMAGE_CACHE_TMP_SHARE", "0.15")),
+    os.environ.get("IMAGE_CACHE_SIZE_LIMIT"),
+)
+
+# Bump when the output changes so that old cache entries are ignored
+NORMALIZATION_VERSION = 1
+# Bedrock Converse limit per image
+MAX_IMAGE_BYTES = int(3.75 * 1024 * 1024)
+NORMALIZED_FILE_EXTENSIONS = [
+    ".jpg",
+    ".jpeg",
+    ".png",
+    ".gif",
+    ".bmp",
+    ".tif",
+    ".tiff",
+    ".webp",
+]
+# Source formats that are photographs more often than not
+LOSSY_SOURCE_FORMATS = ["JPEG", "MPO", "WEBP"]
+PHOTO_SOURCE_FORMATS = ["BMP", "TIFF"]
+PARTIAL_SUFFIX = ".part"
+
+
+def target_size(width: int, height: int) -> Tuple[int, int]:
+    """Size of an image after downscaling to the configured limits."""
+    scale = min(
+        1.0,
+        IMAGE_MAX_LONG_EDGE / max(width, height),
+        math.sqrt(IMAGE_MAX_MEGAPIXELS * 1_000_000 / (width * height)),
+    )
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def normalize_frame(frame: Any, source_format: str) -> Tuple[bytes, str, int, int]:
+    """
+    Normalize one image (or page of an image).
+
+    Args:
+        frame: PIL image
+        source_format: PIL format name of the source file
+
+    Returns:
+        Tuple of (encoded bytes, file extension, width, height)
+    """
+    from PIL import Image, ImageOps
+
+    frame = ImageOps.exif_transpose(frame)
+    has_alpha = frame.mode in ("RGBA", "LA", "PA") or (
+        frame.mode == "P" and "transparency" in frame.info
+    )
+    lossy = not has_alpha and (
+        source_format in LOSSY_SOURCE_FORMATS
+        or (source_format in PHOTO_SOURCE_FORMATS and frame.mode in ("RGB", "CMYK", "YCbCr"))
+    )
+
+    # Resampling needs a continuous-tone mode
+    if frame.mode == "1":
+        frame = frame.convert("L")
+    elif frame.mode not in ("L", "LA", "RGB", "RGBA"):
+        frame = frame.convert("RGBA" if has_alpha else "RGB")
+
+    size = target_size(*frame.size)
+    while True:
+        resized = frame if size == frame.size else frame.resize(size, Image.LANCZOS)
+        # Drop EXIF, ICC profiles, text chunks and other metadata
+        resized.info = {}
+        buffer = io.BytesIO()
+        if lossy:
+            resized.convert("RGB").save(
+                buffer, "JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True
+            )
+            ext = ".jpg"
+        else:
+            resized.save(buffer, "PNG", optimize=True)
+            ext = ".png"
+        data = buffer.getvalue()
+        if len(data) <= MAX_IMAGE_BYTES or min(size) <= 1:
+            return data, ext, size[0], size[1]
+        size = (max(1, int(size[0] * 0.75)), max(1, int(size[1] * 0.75)))
+
+
+class ImageNormalizer:
+    """Normalizes images, caching the output by content hash."""
+
+    def __init__(
+        self,
+        cache_dir: str = IMAGE_CACHE_DIR,
+        size_limit: int = IMAGE_CACHE_SIZE_LIMIT,
+    ):
+        self.cache_dir = cache_dir
+        self.size_limit = size_limit
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(file_path: str) -> str:
+        """Content hash of a file combined with the normalization settings."""
+        digest = hashlib.sha256(
+            f"v{NORMALIZATION_VERSION}/{IMAGE_MAX_LONG_EDGE}/{IMAGE_MAX_MEGAPIXELS}/"
+            f"{IMAGE_JPEG_QUALITY}/{IMAGE_MAX_PAGES}/".encode("utf-8")
+        )
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def normalize(
+        self, file_path: str, output_dir: str, output_stem: str
+    ) -> Dict[str, Any]:
+        """
+        Normalize an image file into a directory.
+
+        Args:
+            file_path: Local path of the image
+            output_dir: Directory to write the normalized image(s) into
+            output_stem: File name stem of the output; pages of multi-page
+                images get a "-p<N>" suffix
+
+        Returns:
+            {"paths": [normalized image per page], "cache_hit": bool}
+        """
+        key = self.cache_key(file_path)
+        pages = self._get_cached(key)
+        cache_hit = pages is not None
+        if pages is None:
+            pages = self._normalize_to_cache(file_path, key)
+
+        paths = []
+        for number, page in enumerate(pages, start=1):
+            suffix = f"-p{number}" if len(pages) > 1 else ""
+            path = os.path.join(output_dir, f"{output_stem}{suffix}{page['ext']}")
+            cached_path = os.path.join(self.cache_dir, page["file"])
+            if os.path.exists(path):
+                os.remove(path)
+            try:
+                os.link(cached_path, path)
+            except OSError:
+                shutil.copyfile(cached_path, path)
+            paths.append(path)
+        return {"paths": paths, "cache_hit": cache_hit}
+
+    def _manifest_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _get_cached(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Pages of a cached normalization, if all of them are still cached."""
+        manifest_path = self._manifest_path(key)
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                pages = json.load(f)["pages"]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"[ImageNormalizer] Ignoring unreadable manifest {manifest_path}: {e}")
+            return None
+
+        paths = [os.path.join(self.cache_dir, page["file"]) for page in pages]
+        if not all(os.path.exists(path) for path in paths):
+            return None
+        for path in [manifest_path, *paths]:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                return None
+        return pages
+
+    def _normalize_to_cache(self, file_path: str, key: str) -> List[Dict[str, Any]]:
+        """Normalize an image and store the result in the cache directory."""
+        from PIL import Image, ImageSequence
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        pages = []
+        with Image.open(file_path) as image:
+            source_format = image.format or ""
+            if source_format == "JPEG":
+                # Let the decoder downscale, instead of decoding every pixel
+                image.draft("RGB", target_size(*image.size))
+            # Only TIFF pages are separate images; other frames are animation
+            frames = (
+                ImageSequence.Iterator(image) if source_format == "TIFF" else [image]
+            )
+            for number, frame in enumerate(frames, start=1):
+                if number > IMAGE_MAX_PAGES:
+                    logger.warning(
+                        f"[ImageNormalizer] Keeping the first {IMAGE_MAX_PAGES} pages of {file_path}"
+                    )
+                    break
+                data, ext, width, height = normalize_frame(frame, source_format)
+                name = f"{key}-{number}{ext}"
+                self._write(os.path.join(self.cache_dir, name), data)
+                pages.append(
+                    {"file": name, "ext": ext, "width": width, "height": height}
+                )
+
+        self._write(
+            self._manifest_path(key), json.dumps({"pages": pages}).encode("utf-8")
+        )
+        keep = {os.path.join(self.cache_dir, page["file"]) for page in pages}
+        keep.add(self._manifest_path(key))
+        self._evict(keep)
+        return pages
+
+    @staticmethod
+    def _write(path: str, data: bytes) -> None:
+        """Write a file atomically."""
+        partial_path = f"{path}.{uuid.uuid4().hex}{PARTIAL_SUFFIX}"
+        try:
+            with open(partial_path, "wb") as f:
+                f.write(data)
+            os.replace(partial_path, path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+    def _evict(self, keep: set) -> None:
+        """Remove least recently used files until the cache fits its budget."""
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(PARTIAL_SUFFIX):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+
+            for _, size, path in sorted(entries):
+                if total <= self.size_limit:
+                    break
+                if path in keep:
+                    continue
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+
+# Shared by every review in the container
+image_normalizer = ImageNormalizer()
+
+
+def normalize_images(
+    file_paths: List[str],
+) -> Tuple[List[str], List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Normalize the images of a review.
+
+    Files that are not images, and images that cannot be decoded, are passed
+    through unchanged.
+
+    Args:
+        file_paths: Downloaded files, in the order the reviewer indexes them
+
+    Returns:
+        Tuple of (file paths to give to the agent; index map with one entry
+        {"index": <original index>, "page": <page number or None>} per
+        returned path; normalization metadata for reviewMeta)
+    """
+    started = time.time()
+    agent_paths: List[str] = []
+    index_map: List[Dict[str, Any]] = []
+    files_meta = []
+
+    for index, file_path in enumerate(file_paths):
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext not in NORMALIZED_FILE_EXTENSIONS:
+            agent_paths.append(file_path)
+            index_map.append({"index": index, "page": None})
+            continue
+
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+        try:
+            normalized = image_normalizer.normalize(
+                file_path, os.path.dirname(file_path), f"{stem}-img{index}"
+            )
+        except Exception as e:
+            logger.warning(f"[ImageNormalizer] Keeping original {file_path}: {e}")
+            agent_paths.append(file_path)
+            index_map.append({"index": index, "page": None})
+            files_meta.append({"file": os.path.basename(file_path), "error": str(e)})
+            continue
+
+        paths = normalized["paths"]
+        agent_paths.extend(paths)
+        for number in range(1, len(paths) + 1):
+            index_map.append({"index": index, "page": number if len(paths) > 1 else None})
+        files_meta.append(
+            {
+                "file": os.path.basename(file_path),
+                "pages": len(paths),
+                "source_bytes": os.path.getsize(file_path),
+                "output_bytes": sum(os.path.getsize(p) for p in paths),
+                "cache_hit": normalized["cache_hit"],
+            }
+        )
+
+    meta = {
+        "duration_seconds": round(time.time() - started, 3),
+        "source_bytes": sum(f.get("source_bytes", 0) for f in files_meta),
+        "output_bytes": sum(f.get("output_bytes", 0) for f in files_meta),
+        "files": files_meta,
+    }
+    logger.info(
+        f"Normalized {len(files_meta)} images into {len(agent_paths)} files "
+        f"({meta['source_bytes']} -> {meta['output_bytes']} bytes) "
+        f"in {meta['duration_seconds']}s"
+    )
+    return agent_paths, index_map, meta
+
+
+def remap_image_indexes(result: Dict[str, Any], index_map: List[Dict[str, Any]]) -> None:
+    """
+    Translate the image indexes of a review result back to the original files.
+
+    Args:
+        result: Review result with usedImageIndexes / boundingBoxes referring
+            to the files given to the agent (updated in place). Boxes on
+            pages after the first of a multi-page image are removed and listed
+            in reviewMeta["dropped_bounding_boxes"]
+        index_map: Index map returned by normalize_images (or dedupe_images)
+    """
+
+    def original(i: Any) -> Optional[Dict[str, Any]]:
+        if isinstance(i, int) and 0 <= i < len(index_map):
+            return index_map[i]
+        return None
+
+    used = result.get("usedImageIndexes")
+    if isinstance(used, list):
+        indexes = set()
+        for entry in map(original, used):
+            if entry is None:
+                continue
+            indexes.add(entry["index"])
+            # Copies collapsed by image_dedupe count as used as well
+            indexes.update(d["index"] for d in entry.get("duplicates", []))
+        result["usedImageIndexes"] = sorted(indexes)
+
+    # Bounding boxes are drawn on the first page of an image, so boxes found
+    # on later pages of a multi-page TIFF cannot be shown and are dropped
+    boxes = []
+    dropped = []
+    for box in result.get("boundingBoxes") or []:
+        if not isinstance(box, dict):
+            boxes.append(box)
+            continue
+        entry = original(box.get("imageIndex"))
+        if entry is None:
+            boxes.append(box)
+            continue
+        if entry["page"] not in (None, 1):
+            dropped.append({"imageIndex": entry["index"], "page": entry["page"]})
+            continue
+        box["imageIndex"] = entry["index"]
+        boxes.append(box)
+    if "boundingBoxes" in result:
+        result["boundingBoxes"] = boxes
+    if dropped:
+        logger.info(f"Dropped bounding boxes on later TIFF pages: {dropped}")
+        result.setdefault("reviewMeta", {})["dropped_bounding_boxes"] = dropped
@@ -3,7 +3,7 @@ import os
 from typing import Any, Dict, List, Optional
 
 import boto3
-from agent import DOCUMENT_MODEL_ID, process_review
+from agent import DOCUMENT_MODEL_ID, process_review, process_review_batch
 from utils import check_environment_variables, get_language_name
 from s3_temp_utils import S3TempStorage
 
@@ -13,6 +13,122 @@ TEMP_BUCKET = os.environ.get("TEMP_BUCKET", "")
 BEDROCK_REGION = os.environ.get("BEDROCK_REGION", "us-west-2")
 
 
+def build_review_output(review_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the Step Functions payload for a single review result.
+
+    Args:
+        review_data: Review results returned by process_review
+
+    Returns:
+        Payload handed to the post-processing step
+    """
+    # Return results to Step Functions - handle both PDF and image results
+    result = {
+        "status": "success",
+        "result": review_data.get("result", "fail"),
+        "confidence": review_data.get("confidence", 0.0),
+        "explanation": review_data.get("explanation", ""),
+        "shortExplanation": review_data.get("shortExplanation", ""),
+        "reviewMeta": review_data.get("reviewMeta"),
+        "inputTokens": review_data.get("inputTokens"),
+        "outputTokens": review_data.get("outputTokens"),
+        "totalCost": review_data.get("totalCost"),
+    }
+
+    # Handle PDF-specific fields
+    if "extractedText" in review_data:
+        result["extractedText"] = review_data["extractedText"]
+        result["pageNumber"] = review_data.get("pageNumber", 1)
+
+    # Handle image-specific fields
+    if "usedImageIndexes" in review_data:
+        result["usedImageIndexes"] = review_data["usedImageIndexes"]
+
+    if "boundingBoxes" in review_data:
+        result["boundingBoxes"] = review_data["boundingBoxes"]
+
+    # Common field for both types
+    if "verificationDetails" in review_data:
+        result["verificationDetails"] = review_data["verificationDetails"]
+
+    return result
+
+
+def handle_batch(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Review every check item in the event against the same documents.
+
+    Event structure:
+    {
+        "reviewJobId": "job-id",
+        "documentPaths": ["s3-path-1", "s3-path-2"],
+        "checks": [
+            {
+                "checkId": "check-id",
+                "reviewResultId": "result-id",
+                "checkName": "check name",
+                "checkDescription": "check description"
+            }
+        ],
+        "languageName": "language name",
+        "mcpServers": []
+    }
+
+    Returns one S3 temp reference per check, in the order of "checks".
+    """
+    review_job_id = event.get("reviewJobId", "")
+    document_paths = event.get("documentPaths", [])
+    checks = event.get("checks", [])
+    language_name = event.get("languageName", "日本語")
+    mcp_servers = event.get("mcpServers", [])
+
+    if not document_paths:
+        raise ValueError("Missing document paths")
+
+    print(
+        f"[Strands MCP] Processing batch of {len(checks)} review items for job: {review_job_id}"
+    )
+    print(f"[DEBUG LAMBDA] MCP servers configuration: {json.dumps(mcp_servers)}")
+
+    batch_results = process_review_batch(
+        document_bucket=DOCUMENT_BUCKET,
+        document_paths=document_paths,
+        checks=checks,
+        language_name=language_name,
+        model_id=DOCUMENT_MODEL_ID,
+        mcpServers=mcp_servers,
+    )
+
+    s3_temp = S3TempStorage(TEMP_BUCKET)
+    results: List[Dict[str, Any]] = []
+    for item in batch_results:
+        if item["status"] == "success":
+            payload = build_review_output(item["reviewData"])
+            print(
+                f"[Strands MCP] Review complete for check {item['checkId']} with result: {payload['result']}"
+            )
+        else:
+            payload = {"status": "error", "message": item["message"]}
+            print(
+                f"[Strands MCP] Error processing review item {item['reviewResultId']}: {item['message']}"
+            )
+        payload["checkId"] = item["checkId"]
+        payload["reviewResultId"] = item["reviewResultId"]
+
+        ref = s3_temp.store(payload)
+        results.append(
+            {
+                **ref,
+                "checkId": item["checkId"],
+                "reviewResultId": item["reviewResultId"],
+                "status": payload["status"],
+            }
+        )
+
+    return {"status": "success", "reviewJobId": review_job_id, "results": results}
+
+
 def handler(event, context):
     """
     Lambda handler for the review item processor using Strands and MCP.
@@ -27,6 +143,9 @@ def handler(event, context):
         "checkDescription": "check description",
         "languageName": "language name"
     }
+
+    When the event carries a "checks" list instead of a single check, all
+    of them are reviewed in one invocation (see handle_batch).
     """
     print(f"[Strands MCP] Received event: {json.dumps(event)}")
 
@@ -41,6 +160,9 @@ def handler(event, context):
             "message": f"Missing required environment variables: {', '.join(missing_vars)}",
         }
 
+    if "checks" in event:
+        return handle_batch(event)
+
     # Extract parameters from the event
     review_job_id = event.get("reviewJobId", "")
     check_id = event.get("checkId", "")
@@ -74,34 +196,7 @@ def handler(event, context):
             mcpServers=mcp_servers,
         )
 
-        # Return results to Step Functions - handle both PDF and image results
-        result = {
-            "status": "success",
-            "result": review_data.get("result", "fail"),
-            "confidence": review_data.get("confidence", 0.0),
-            "explanation": review_data.get("explanation", ""),
-            "shortExplanation": review_data.get("shortExplanation", ""),
-            "reviewMeta": review_data.get("reviewMeta"),
-            "inputTokens": review_data.get("inputTokens"),
-            "outputTokens": review_data.get("outputTokens"),
-            "totalCost": review_data.get("totalCost"),
-        }
-
-        # Handle PDF-specific fields
-        if "extractedText" in review_data:
-            result["extractedText"] = review_data["extractedText"]
-            result["pageNumber"] = review_data.get("pageNumber", 1)
-
-        # Handle image-specific fields
-        if "usedImageIndexes" in review_data:
-            result["usedImageIndexes"] = review_data["usedImageIndexes"]
-
-        if "boundingBoxes" in review_data:
-            result["boundingBoxes"] = review_data["boundingBoxes"]
-
-        # Common field for both types
-        if "verificationDetails" in review_data:
-            result["verificationDetails"] = review_data["verificationDetails"]
+        result = build_review_output(review_data)
 
         print(f"[Strands MCP] Review complete with result: {result['result']}")
         
@@ -1,17 +1,145 @@
 """Expanded module of: https://github.com/awslabs/run-model-context-protocol-servers-with-aws-lambda/blob/254672e3f7dc5e08f58093efb787acdb6417bd86/src/python/src/mcp_lambda/client/lambda_client.py#L22"""
 
+import asyncio
+import atexit
 import json
 import logging
-from contextlib import asynccontextmanager
+import os
+import threading
+from contextlib import AsyncExitStack, asynccontextmanager
 from typing import Any
 
 import anyio
 import anyio.lowlevel
 import mcp.types as types
+from aiobotocore.config import AioConfig
 from aiobotocore.session import get_session
 from anyio.streams.memory import MemoryObjectReceiveStream, MemoryObjectSendStream
 from mcp.shared.message import SessionMessage
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+# Connection pool size of the shared Lambda client
+LAMBDA_CLIENT_MAX_POOL_CONNECTIONS = int(
+    os.environ.get("LAMBDA_CLIENT_MAX_POOL_CONNECTIONS", "50")
+)
+# How long idle connections to the Lambda API are kept open
+LAMBDA_CLIENT_KEEPALIVE_SECONDS = float(
+    os.environ.get("LAMBDA_CLIENT_KEEPALIVE_SECONDS", "60")
+)
+# Default number of JSON-RPC messages of one MCP session in flight at once
+LAMBDA_CLIENT_MAX_CONCURRENT_INVOCATIONS = int(
+    os.environ.get("LAMBDA_CLIENT_MAX_CONCURRENT_INVOCATIONS", "8")
+)
+# Maximum number of queued JSON-RPC messages sent together as one batch
+LAMBDA_CLIENT_MAX_BATCH_SIZE = int(os.environ.get("LAMBDA_CLIENT_MAX_BATCH_SIZE", "10"))
+
+# The only protocol version the mcp-runtime functions accept, and the
+# capabilities they declare (LATEST_PROTOCOL_VERSION and handle_initialize in
+# cdk/lib/constructs/mcp-runtime); keep in sync
+RUNTIME_PROTOCOL_VERSION = "2025-03-26"
+RUNTIME_INITIALIZE_RESULT: dict[str, Any] = {
+    "protocolVersion": RUNTIME_PROTOCOL_VERSION,
+    "capabilities": {
+        "logging": {},
+        "prompts": {"listChanged": True},
+        "resources": {"subscribe": True, "listChanged": True},
+        "tools": {"listChanged": True},
+    },
+    "serverInfo": {"name": "MCPLambdaServer", "version": "1.0.0"},
+}
+
+
+class SharedLambdaClient:
+    """
+    Process-wide aiobotocore Lambda client.
+
+    An aiobotocore client is bound to the event loop it was created on, while
+    every MCPClient runs its transport on a loop of its own. The clients
+    therefore live on a dedicated loop thread and transports hand their invokes
+    over to it, so all MCP sessions in the process share one credential
+    resolution and one connection pool per region.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._exit_stack: AsyncExitStack | None = None
+        self._clients: dict[str, Any] = {}
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the client loop thread on first use."""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._exit_stack = AsyncExitStack()
+                threading.Thread(
+                    target=self._loop.run_forever, name="lambda-client", daemon=True
+                ).start()
+            return self._loop
+
+    async def _get_client(self, region_name: str) -> Any:
+        """Get the client for a region, creating it on first use (client loop)."""
+        client = self._clients.get(region_name)
+        if client is None:
+            logging.debug(f"Creating shared Lambda client ({region_name})")
+            client = await self._exit_stack.enter_async_context(
+                get_session().create_client(
+                    "lambda",
+                    region_name=region_name,
+                    config=AioConfig(
+                        max_pool_connections=LAMBDA_CLIENT_MAX_POOL_CONNECTIONS,
+                        tcp_keepalive=True,
+                        connector_args={
+                            "keepalive_timeout": LAMBDA_CLIENT_KEEPALIVE_SECONDS
+                        },
+                    ),
+                )
+            )
+            self._clients[region_name] = client
+        return client
+
+    async def _invoke(self, region_name: str, **kwargs: Any) -> dict[str, Any]:
+        """Invoke and read the response payload (client loop)."""
+        client = await self._get_client(region_name)
+        function_response = await client.invoke(**kwargs)
+        async with function_response["Payload"] as stream:
+            function_response["Payload"] = await stream.read()
+        return function_response
+
+    async def invoke(self, region_name: str, **kwargs: Any) -> dict[str, Any]:
+        """
+        Call the Lambda Invoke API from any event loop.
+
+        Args:
+            region_name: AWS region of the function
+            **kwargs: Invoke API parameters
+
+        Returns:
+            Invoke response with "Payload" already read into bytes
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self._invoke(region_name, **kwargs), self._ensure_loop()
+        )
+        return await asyncio.wrap_future(future)
+
+    def close(self) -> None:
+        """Close all clients and stop the loop thread."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._exit_stack.aclose(), loop).result(5)
+        except Exception as exc:
+            logging.debug(f"Failed to close shared Lambda client: {exc}")
+        finally:
+            self._clients = {}
+            loop.call_soon_threadsafe(loop.stop)
+
+
+# Module level so that it survives across warm invocations
+shared_lambda_client = SharedLambdaClient()
+atexit.register(shared_lambda_client.close)
 
 
 class LambdaFunctionParameters(BaseModel):
@@ -24,6 +152,23 @@ class LambdaFunctionParameters(BaseModel):
     mcp_server: dict[str, Any] | None = None
     """The MCP server specification, if any."""
 
+    max_concurrent_invocations: int = Field(
+        default=LAMBDA_CLIENT_MAX_CONCURRENT_INVOCATIONS, ge=1
+    )
+    """Maximum number of Lambda invocations in flight for this session."""
+
+    batch_messages: bool = False
+    """Whether the function accepts JSON-RPC batches (arrays of messages)."""
+
+    local_initialize: bool = False
+    """
+    Whether to answer the initialize handshake locally with
+    RUNTIME_INITIALIZE_RESULT instead of invoking the function, when the
+    client asks for RUNTIME_PROTOCOL_VERSION. Only valid for the mcp-runtime
+    functions, which answer it statically; other versions are forwarded so
+    that the function rejects them as it always has.
+    """
+
 
 @asynccontextmanager
 async def lambda_function_client(lambda_function: LambdaFunctionParameters):
@@ -37,105 +182,166 @@ async def lambda_function_client(lambda_function: LambdaFunctionParameters):
     write_stream: MemoryObjectSendStream[SessionMessage]
     write_stream_reader: MemoryObjectReceiveStream[SessionMessage]
 
-    read_stream_writer, read_stream = anyio.create_memory_object_stream(0)
-    write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
+    read_stream_writer, read_stream = anyio.create_memory_object_stream(
+        lambda_function.max_concurrent_invocations
+    )
+    # With batching, messages must be able to queue up while every invocation
+    # slot is busy; a zero-capacity stream would block each sender instead
+    write_stream, write_stream_reader = anyio.create_memory_object_stream(
+        LAMBDA_CLIENT_MAX_BATCH_SIZE if lambda_function.batch_messages else 0
+    )
 
-    lambda_session = get_session()
+    limiter = anyio.Semaphore(lambda_function.max_concurrent_invocations)
 
     # MCP clients generally assume there is a read stream and a write stream.
     # When messages are received on the write stream, they are forwarded to the
-    # Lambda function via Invoke API. The function response is written
-    # to the read stream.
+    # Lambda function via Invoke API (through the shared client). The function
+    # response is written to the read stream. Up to max_concurrent_invocations
+    # invocations are in flight at once; the client session matches responses
+    # to requests by JSON-RPC id, so they may arrive in any order. With
+    # batch_messages, messages that queue up while waiting for a free slot are
+    # sent together as one JSON-RPC batch.
+    def to_message_dict(session_message: SessionMessage) -> dict[str, Any]:
+        message = session_message.message
+        logging.debug(
+            f"MCP JSON RPC message raw: {message.__class__.__name__} {message}"
+        )
+        message_dict = message.model_dump(by_alias=True, exclude_none=True)
+        if lambda_function.mcp_server is not None:
+            message_dict["mcpServer"] = lambda_function.mcp_server
+        return message_dict
+
+    async def forward_messages(session_messages: list[SessionMessage]):
+        message_dicts = [to_message_dict(m) for m in session_messages]
+        payload = message_dicts if len(message_dicts) > 1 else message_dicts[0]
+        message_json = json.dumps(payload, separators=(",", ":"))
+        # Notifications have no response, so do not wait for one
+        notifications_only = all(
+            isinstance(m.message.root, types.JSONRPCNotification)
+            for m in session_messages
+        )
+
+        try:
+            logging.debug(
+                f"Invoking function: {lambda_function.function_name} "
+                f"({len(message_dicts)} message(s))"
+            )
+            function_response = await shared_lambda_client.invoke(
+                lambda_function.region_name,
+                FunctionName=lambda_function.function_name,
+                InvocationType="Event" if notifications_only else "RequestResponse",
+                Payload=message_json.encode(encoding="utf-8", errors="strict"),
+            )
+
+            logging.debug(f"Lambda function response: {function_response}")
+
+            if notifications_only:
+                return
+
+            response_payload = function_response["Payload"].decode(
+                encoding="utf-8", errors="strict"
+            )
+            logging.debug(f"Lambda function response payload: {response_payload}")
+
+            if "FunctionError" in function_response and function_response["FunctionError"]:
+                raise Exception(
+                    "Function invoke returned a function error",
+                    function_response,
+                    response_payload,
+                )
+
+            if response_payload == "{}":
+                # Assume we sent a notification and do not expect a response
+                return
+
+            response_json = json.loads(response_payload)
+            if not isinstance(response_json, list):
+                response_json = [response_json]
+            response_messages = [
+                types.JSONRPCMessage.model_validate(item)
+                for item in response_json
+                if item
+            ]
+        except Exception as exc:
+            logging.debug(exc)
+            requests = [m for m in message_dicts if "jsonrpc" in m and "id" in m]
+            for message_dict in requests:
+                error_message = types.JSONRPCMessage(
+                    types.JSONRPCError(
+                        jsonrpc=message_dict["jsonrpc"],
+                        id=message_dict["id"],
+                        error=types.ErrorData(
+                            code=500,
+                            message=str(exc),
+                        ),
+                    )
+                )
+                await read_stream_writer.send(SessionMessage(error_message))
+            if not requests:
+                await read_stream_writer.send(exc)
+            return
+
+        for response_message in response_messages:
+            await read_stream_writer.send(SessionMessage(response_message))
+
+    async def handle_locally(session_message: SessionMessage) -> bool:
+        """Answer the initialize handshake without invoking the function."""
+        if not lambda_function.local_initialize:
+            return False
+
+        message = session_message.message.root
+        if isinstance(message, types.JSONRPCNotification):
+            # The runtimes ignore notifications/initialized (stateless)
+            return message.method == "notifications/initialized"
+        if not isinstance(message, types.JSONRPCRequest) or message.method != "initialize":
+            return False
+
+        client_version = (message.params or {}).get("protocolVersion")
+        if client_version != RUNTIME_PROTOCOL_VERSION:
+            # The runtime rejects every other version; let it answer
+            return False
+
+        logging.debug(f"Answering initialize locally ({client_version})")
+        response = types.JSONRPCResponse(
+            jsonrpc=message.jsonrpc,
+            id=message.id,
+            result=RUNTIME_INITIALIZE_RESULT,
+        )
+        await read_stream_writer.send(SessionMessage(types.JSONRPCMessage(response)))
+        return True
+
+    async def drain_queued(session_message: SessionMessage) -> list[SessionMessage]:
+        """Collect messages already waiting on the write stream into a batch."""
+        batch = [session_message]
+        if lambda_function.batch_messages:
+            while len(batch) < LAMBDA_CLIENT_MAX_BATCH_SIZE:
+                try:
+                    queued = write_stream_reader.receive_nowait()
+                except (anyio.WouldBlock, anyio.EndOfStream):
+                    break
+                if not await handle_locally(queued):
+                    batch.append(queued)
+        return batch
+
+    async def forward_and_release(session_messages: list[SessionMessage]):
+        try:
+            await forward_messages(session_messages)
+        except anyio.ClosedResourceError:
+            # The session went away while the invoke was in flight
+            await anyio.lowlevel.checkpoint()
+        finally:
+            limiter.release()
+
     async def invoke_function():
         try:
-            async with lambda_session.create_client(
-                "lambda", region_name=lambda_function.region_name
-            ) as lambda_client:
-                async with write_stream_reader:
-                    async for session_message in write_stream_reader:
-                        message = session_message.message
-                        logging.debug(
-                            f"MCP JSON RPC message raw: {message.__class__.__name__} {message}"
-                        )
-                        message_dict = message.model_dump(
-                            by_alias=True, exclude_none=True
-                        )
-                        if lambda_function.mcp_server is not None:
-                            message_dict["mcpServer"] = lambda_function.mcp_server
-
-                        message_json = json.dumps(message_dict, separators=(",", ":"))
-
-                        # message_json = message.model_dump_json(
-                        #     by_alias=True, exclude_none=True
-                        # )
-                        # logging.debug(f"MCP JSON RPC message JSON: {message_json}")
-
-                        try:
-                            logging.debug(
-                                f"Invoking function: {lambda_function.function_name}"
-                            )
-                            function_response = await lambda_client.invoke(
-                                FunctionName=lambda_function.function_name,
-                                InvocationType="RequestResponse",
-                                Payload=message_json.encode(
-                                    encoding="utf-8", errors="strict"
-                                ),
-                            )
-
-                            logging.debug(
-                                f"Lambda function response: {function_response}"
-                            )
-
-                            async with function_response["Payload"] as stream:
-                                payload = await stream.read()
-                                response_payload = payload.decode(
-                                    encoding="utf-8", errors="strict"
-                                )
-                                logging.debug(
-                                    f"Lambda function response payload: {response_payload}"
-                                )
-
-                                if (
-                                    "FunctionError" in function_response
-                                    and function_response["FunctionError"]
-                                ):
-                                    raise Exception(
-                                        "Function invoke returned a function error",
-                                        function_response,
-                                        response_payload,
-                                    )
-
-                                if response_payload == "{}":
-                                    # Assume we sent a notification and do not expect a response
-                                    continue
-
-                                response_message = (
-                                    types.JSONRPCMessage.model_validate_json(
-                                        response_payload
-                                    )
-                                )
-                        except Exception as exc:
-                            logging.debug(exc)
-                            if "jsonrpc" in message_dict and "id" in message_dict:
-                                error_message = types.JSONRPCMessage(
-                                    types.JSONRPCError(
-                                        jsonrpc=message_dict["jsonrpc"],
-                                        id=message_dict["id"],
-                                        error=types.ErrorData(
-                                            code=500,
-                                            message=str(exc),
-                                        ),
-                                    )
-                                )
-                                await read_stream_writer.send(
-                                    SessionMessage(error_message)
-                                )
-                            else:
-                                await read_stream_writer.send(exc)
-                            continue
-
-                        session_message = SessionMessage(response_message)
-                        await read_stream_writer.send(session_message)
+            async with write_stream_reader, anyio.create_task_group() as dispatch_tg:
+                async for session_message in write_stream_reader:
+                    if await handle_locally(session_message):
+                        continue
+                    await limiter.acquire()
+                    dispatch_tg.start_soon(
+                        forward_and_release, await drain_queued(session_message)
+                    )
         except anyio.ClosedResourceError:
             await anyio.lowlevel.checkpoint()
         except Exception as exc:
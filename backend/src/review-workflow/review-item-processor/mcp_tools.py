@@ -0,0 +1,441 @@
+"""
+MCP tool catalog cache and lazily connected MCP tools.
+
+Listing the tools of an MCP server costs an `initialize` and a `tools/list`
+round trip through the MCP runtime Lambda, which may have to start the server
+from scratch. The tool catalog of a server only depends on its specification,
+so it is cached per normalized `mcpServer` spec in memory (for the lifetime of
+a warm container) and optionally in S3 (shared by all containers).
+
+Tools built from a cached catalog do not hold a connection. The MCP client is
+started the first time the model actually calls one of the server's tools.
+
+Successful results of allow-listed tools are cached as well, keyed by server,
+tool name and arguments, because reviews across a checklist and across jobs
+tend to ask the same questions (the same company name, address or
+documentation page). Caching is opt-in per tool: a tool that reads live data
+or has side effects must never be answered from the cache.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from clients import get_boto3_client
+from strands.tools.mcp import MCPClient
+from strands.types.tools import AgentTool, ToolResult, ToolSpec, ToolUse
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+MCP_TOOL_CATALOG_TTL_SECONDS = int(
+    os.environ.get("MCP_TOOL_CATALOG_TTL_SECONDS", "3600")
+)
+# Optional shared tier; leave empty to cache in memory only
+MCP_TOOL_CATALOG_BUCKET = os.environ.get("MCP_TOOL_CATALOG_BUCKET", "")
+MCP_TOOL_CATALOG_PREFIX = os.environ.get(
+    "MCP_TOOL_CATALOG_PREFIX", "mcp-tool-catalog/"
+)
+
+# TTL of cached results of tools missing from MCP_TOOL_RESULT_TOOL_TTLS;
+# 0 (the default) caches allow-listed tools only
+MCP_TOOL_RESULT_TTL_SECONDS = int(os.environ.get("MCP_TOOL_RESULT_TTL_SECONDS", "0"))
+# Allow-list of cached tools with their TTLs as JSON; the default covers the
+# read-only tools of the AWS documentation MCP server
+MCP_TOOL_RESULT_TOOL_TTLS: Dict[str, int] = json.loads(
+    os.environ.get(
+        "MCP_TOOL_RESULT_TOOL_TTLS",
+        '{"read_documentation": 3600, "search_documentation": 900}',
+    )
+)
+# Comma separated names of non-deterministic tools whose results are never cached
+MCP_TOOL_RESULT_EXCLUDE = [
+    name.strip()
+    for name in os.environ.get("MCP_TOOL_RESULT_EXCLUDE", "").split(",")
+    if name.strip()
+]
+MCP_TOOL_RESULT_MAX_ENTRIES = int(os.environ.get("MCP_TOOL_RESULT_MAX_ENTRIES", "512"))
+# Optional shared tier; leave empty to cache in memory only
+MCP_TOOL_RESULT_BUCKET = os.environ.get("MCP_TOOL_RESULT_BUCKET", "")
+MCP_TOOL_RESULT_PREFIX = os.environ.get("MCP_TOOL_RESULT_PREFIX", "mcp-tool-result/")
+
+
+def mcp_server_spec_hash(mcp_server_cfg: Dict[str, Any]) -> str:
+    """
+    Hash of the parts of an MCP server configuration that determine its tools.
+
+    Args:
+        mcp_server_cfg: MCP server configuration
+
+    Returns:
+        Hex digest identifying the server
+    """
+    normalized = {
+        "command": mcp_server_cfg.get("command"),
+        "args": list(mcp_server_cfg.get("args") or []),
+        "env": dict(sorted((mcp_server_cfg.get("env") or {}).items())),
+    }
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ToolCatalogCache:
+    """TTL cache of MCP tool specifications keyed by server spec hash."""
+
+    def __init__(
+        self,
+        ttl_seconds: int = MCP_TOOL_CATALOG_TTL_SECONDS,
+        bucket_name: str = MCP_TOOL_CATALOG_BUCKET,
+        key_prefix: str = MCP_TOOL_CATALOG_PREFIX,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.bucket_name = bucket_name
+        self.key_prefix = key_prefix
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, spec_hash: str) -> Optional[List[ToolSpec]]:
+        """
+        Get the cached tool specifications of a server.
+
+        Args:
+            spec_hash: Hash returned by mcp_server_spec_hash
+
+        Returns:
+            List of tool specifications, or None if not cached or expired
+        """
+        if self.ttl_seconds <= 0:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(spec_hash)
+        if entry is not None and entry["expires_at"] > time.time():
+            return entry["tool_specs"]
+
+        entry = self._get_shared(spec_hash)
+        if entry is not None:
+            with self._lock:
+                self._entries[spec_hash] = entry
+            return entry["tool_specs"]
+        return None
+
+    def put(self, spec_hash: str, tool_specs: List[ToolSpec]) -> None:
+        """
+        Cache the tool specifications of a server.
+
+        Args:
+            spec_hash: Hash returned by mcp_server_spec_hash
+            tool_specs: Tool specifications reported by the server
+        """
+        if self.ttl_seconds <= 0:
+            return
+
+        entry = {
+            "tool_specs": tool_specs,
+            "expires_at": time.time() + self.ttl_seconds,
+        }
+        with self._lock:
+            self._entries[spec_hash] = entry
+        self._put_shared(spec_hash, entry)
+
+    def _get_shared(self, spec_hash: str) -> Optional[Dict[str, Any]]:
+        """Read a catalog entry from the S3 tier."""
+        if not self.bucket_name:
+            return None
+        try:
+            response = get_boto3_client("s3").get_object(
+                Bucket=self.bucket_name, Key=f"{self.key_prefix}{spec_hash}.json"
+            )
+            entry = json.loads(response["Body"].read().decode("utf-8"))
+        except Exception as e:
+            logger.debug(f"[ToolCatalog] No shared entry for {spec_hash}: {e}")
+            return None
+        if entry.get("expires_at", 0) <= time.time():
+            return None
+        return entry
+
+    def _put_shared(self, spec_hash: str, entry: Dict[str, Any]) -> None:
+        """Write a catalog entry to the S3 tier."""
+        if not self.bucket_name:
+            return
+        try:
+            get_boto3_client("s3").put_object(
+                Bucket=self.bucket_name,
+                Key=f"{self.key_prefix}{spec_hash}.json",
+                Body=json.dumps(entry, ensure_ascii=False).encode("utf-8"),
+                ContentType="application/json",
+            )
+        except Exception as e:
+            logger.warning(f"[ToolCatalog] Failed to store shared entry {spec_hash}: {e}")
+
+
+class ToolResultCache:
+    """LRU + TTL cache of successful MCP tool results."""
+
+    def __init__(
+        self,
+        default_ttl_seconds: int = MCP_TOOL_RESULT_TTL_SECONDS,
+        tool_ttls: Optional[Dict[str, int]] = None,
+        exclude: Optional[List[str]] = None,
+        max_entries: int = MCP_TOOL_RESULT_MAX_ENTRIES,
+        bucket_name: str = MCP_TOOL_RESULT_BUCKET,
+        key_prefix: str = MCP_TOOL_RESULT_PREFIX,
+    ):
+        self.default_ttl_seconds = default_ttl_seconds
+        self.tool_ttls = MCP_TOOL_RESULT_TOOL_TTLS if tool_ttls is None else tool_ttls
+        self.exclude = set(MCP_TOOL_RESULT_EXCLUDE if exclude is None else exclude)
+        self.max_entries = max_entries
+        self.bucket_name = bucket_name
+        self.key_prefix = key_prefix
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ttl_for(self, tool_name: str) -> int:
+        """TTL in seconds for results of the given tool (0 = not cached)."""
+        if tool_name in self.exclude:
+            return 0
+        return int(self.tool_ttls.get(tool_name, self.default_ttl_seconds))
+
+    @staticmethod
+    def cache_key(spec_hash: str, tool_name: str, arguments: Any) -> str:
+        """
+        Key of a tool call.
+
+        Args:
+            spec_hash: Hash returned by mcp_server_spec_hash
+            tool_name: Name of the MCP tool
+            arguments: Tool arguments (canonicalized here)
+
+        Returns:
+            Hex digest identifying the call
+        """
+        payload = json.dumps(
+            [spec_hash, tool_name, arguments],
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached tool result.
+
+        Args:
+            key: Key returned by cache_key
+
+        Returns:
+            {"status", "content"} of the cached result, or None if not cached
+            or expired
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry["expires_at"] > now:
+                    self._entries.move_to_end(key)
+                    return entry["result"]
+                del self._entries[key]
+
+        entry = self._get_shared(key)
+        if entry is not None:
+            self._remember(key, entry)
+            return entry["result"]
+        return None
+
+    def put(self, key: str, tool_name: str, result: Dict[str, Any]) -> None:
+        """
+        Cache a successful tool result.
+
+        Args:
+            key: Key returned by cache_key
+            tool_name: Name of the MCP tool (selects the TTL)
+            result: {"status", "content"} of the result
+        """
+        ttl = self.ttl_for(tool_name)
+        if ttl <= 0:
+            return
+        entry = {"result": result, "expires_at": time.time() + ttl}
+        self._remember(key, entry)
+        self._put_shared(key, entry)
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        """Store an entry in memory, evicting the least recently used ones."""
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_shared(self, key: str) -> Optional[Dict[str, Any]]:
+        """Read a result from the S3 tier."""
+        if not self.bucket_name:
+            return None
+        try:
+            response = get_boto3_client("s3").get_object(
+                Bucket=self.bucket_name, Key=f"{self.key_prefix}{key}.json"
+            )
+            entry = json.loads(response["Body"].read().decode("utf-8"))
+        except Exception as e:
+            logger.debug(f"[ToolResult] No shared entry for {key}: {e}")
+            return None
+        if entry.get("expires_at", 0) <= time.time():
+            return None
+        return entry
+
+    def _put_shared(self, key: str, entry: Dict[str, Any]) -> None:
+        """Write a result to the S3 tier."""
+        if not self.bucket_name:
+            return
+        try:
+            # Results with binary content (e.g. images) are not JSON serializable
+            # and stay in memory only
+            body = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+            get_boto3_client("s3").put_object(
+                Bucket=self.bucket_name,
+                Key=f"{self.key_prefix}{key}.json",
+                Body=body,
+                ContentType="application/json",
+            )
+        except Exception as e:
+            logger.warning(f"[ToolResult] Failed to store shared entry {key}: {e}")
+
+
+class LazyMCPServer:
+    """MCP server connection that is only started when first needed."""
+
+    def __init__(
+        self,
+        mcp_server_cfg: Dict[str, Any],
+        client_factory: Callable[[Dict[str, Any]], MCPClient],
+    ):
+        self.mcp_server_cfg = mcp_server_cfg
+        self.spec_hash = mcp_server_spec_hash(mcp_server_cfg)
+        self._client_factory = client_factory
+        self._client: Optional[MCPClient] = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        """Whether the MCP client has been started."""
+        return self._client is not None
+
+    def client(self) -> MCPClient:
+        """Get the running MCP client, starting it on first use."""
+        with self._lock:
+            if self._client is None:
+                if self._closed:
+                    raise RuntimeError("MCP server connection is closed")
+                logger.info(f"Starting MCP client for server {self.spec_hash[:12]}")
+                client = self._client_factory(self.mcp_server_cfg)
+                client.start()
+                if self._closed:
+                    # Closed while starting (e.g. startup timed out); do not leak it
+                    client.stop(None, None, None)
+                    raise RuntimeError("MCP server connection was closed during startup")
+                self._client = client
+            return self._client
+
+    def list_tool_specs(self) -> List[ToolSpec]:
+        """List the tool specifications reported by the server."""
+        return [tool.tool_spec for tool in self.client().list_tools_sync()]
+
+    def close(self) -> None:
+        """
+        Stop the MCP client if it was started.
+
+        Does not wait for a client that is still starting; that client is
+        stopped by the starting thread as soon as its startup completes.
+        """
+        self._closed = True
+        if not self._lock.acquire(blocking=False):
+            logger.info(f"MCP client for server {self.spec_hash[:12]} is still starting")
+            return
+        try:
+            if self._client is not None:
+                logger.info(f"Stopping MCP client for server {self.spec_hash[:12]}")
+                self._client.stop(None, None, None)
+                self._client = None
+        finally:
+            self._lock.release()
+
+
+class LazyMCPAgentTool(AgentTool):
+    """AgentTool built from a cached tool specification of an MCP server."""
+
+    def __init__(self, tool_spec: ToolSpec, server: LazyMCPServer) -> None:
+        super().__init__()
+        self._tool_spec = tool_spec
+        self.server = server
+
+    @property
+    def tool_name(self) -> str:
+        """Name of the MCP tool."""
+        return self._tool_spec["name"]
+
+    @property
+    def tool_spec(self) -> ToolSpec:
+        """Specification of the MCP tool."""
+        return self._tool_spec
+
+    @property
+    def tool_type(self) -> str:
+        """Type of the tool, always "python" as for strands MCP tools."""
+        return "python"
+
+    def invoke(self, tool: ToolUse, *args: Any, **kwargs: dict[str, Any]) -> ToolResult:
+        """
+        Invoke the MCP tool, connecting to the server if necessary.
+
+        Results are served from and stored in tool_result_cache.
+        """
+        logger.debug(f"Invoking MCP tool '{self.tool_name}' ({tool['toolUseId']})")
+        cacheable = tool_result_cache.ttl_for(self.tool_name) > 0
+        if cacheable:
+            key = tool_result_cache.cache_key(
+                self.server.spec_hash, self.tool_name, tool["input"]
+            )
+            cached = tool_result_cache.get(key)
+            if cached is not None:
+                logger.info(f"MCP tool '{self.tool_name}' result served from cache")
+                return ToolResult(
+                    status=cached["status"],
+                    toolUseId=tool["toolUseId"],
+                    content=cached["content"],
+                )
+
+        result = self._call(tool)
+        if cacheable and result.get("status") == "success":
+            tool_result_cache.put(
+                key,
+                self.tool_name,
+                {"status": result["status"], "content": result["content"]},
+            )
+        return result
+
+    def _call(self, tool: ToolUse) -> ToolResult:
+        """Call the MCP tool on the server."""
+        try:
+            client = self.server.client()
+        except Exception as e:
+            logger.warning(f"MCP server for tool '{self.tool_name}' failed to start: {e}")
+            return ToolResult(
+                status="error",
+                toolUseId=tool["toolUseId"],
+                content=[{"text": f"Tool execution failed: {str(e)}"}],
+            )
+        return client.call_tool_sync(
+            tool_use_id=tool["toolUseId"], name=self.tool_name, arguments=tool["input"]
+        )
+
+
+# Shared by every review in the container
+tool_catalog_cache = ToolCatalogCache()
+tool_result_cache = ToolResultCache()
@@ -0,0 +1,207 @@
+"""
+Per-check page retrieval over extracted document text.
+
+A check such as "the contractor's address is stated" usually concerns one or
+two pages, yet the agent was given every page of a 200-page contract. A small
+BM25 index is built once per document version from the page-indexed text
+artifact (see document_text) and queried with the check name and description.
+Only the best matching pages, plus their neighbours, are given to the agent.
+
+Everything runs locally and needs no extra dependencies. Latin text is split
+into words. Japanese, Chinese and Korean text has no spaces, so it is
+indexed as overlapping character bigrams.
+
+Retrieval is skipped when it is unlikely to help or be safe:
+
+- the document is short;
+- none of the query terms occur in the document;
+- the selected pages cover too little of the query's weight in the
+  document, which means the evidence is spread out.
+
+In those cases the caller keeps the full document.
+"""
+
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+PAGE_RETRIEVAL_ENABLED = (
+    os.environ.get("PAGE_RETRIEVAL_ENABLED", "true").lower() == "true"
+)
+# Documents with fewer pages are always given in full
+PAGE_RETRIEVAL_MIN_PAGES = int(os.environ.get("PAGE_RETRIEVAL_MIN_PAGES", "30"))
+# Number of best matching pages selected per check
+PAGE_RETRIEVAL_TOP_K = int(os.environ.get("PAGE_RETRIEVAL_TOP_K", "8"))
+# Pages before and after each selected page that are included as context
+PAGE_RETRIEVAL_NEIGHBORS = int(os.environ.get("PAGE_RETRIEVAL_NEIGHBORS", "1"))
+# Share of the query's weight in the document the selected pages must cover
+PAGE_RETRIEVAL_MIN_COVERAGE = float(
+    os.environ.get("PAGE_RETRIEVAL_MIN_COVERAGE", "0.6")
+)
+# Number of page indexes kept in memory across warm invocations
+PAGE_INDEX_CACHE_ENTRIES = int(os.environ.get("PAGE_INDEX_CACHE_ENTRIES", "32"))
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Hiragana/katakana, CJK ideographs, Hangul and half-width katakana
+_CJK_CHARS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff66-\uff9f"
+_WORD_PATTERN = re.compile(rf"[{_CJK_CHARS}]+|\w+")
+_CJK_PATTERN = re.compile(rf"[{_CJK_CHARS}]")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into index terms.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        Lower-cased words, and character bigrams for CJK runs
+    """
+    terms = []
+    for run in _WORD_PATTERN.findall(text.lower()):
+        if _CJK_PATTERN.match(run):
+            if len(run) == 1:
+                terms.append(run)
+            else:
+                terms.extend(run[i : i + 2] for i in range(len(run) - 1))
+        else:
+            terms.append(run)
+    return terms
+
+
+class PageIndex:
+    """BM25 index over the pages of one document."""
+
+    def __init__(self, pages: List[Dict[str, Any]]):
+        """
+        Args:
+            pages: Pages of a document text artifact ({"page", "text"})
+        """
+        self.pages = pages
+        self._term_freqs = [Counter(tokenize(page["text"])) for page in pages]
+        self._lengths = [sum(tf.values()) for tf in self._term_freqs]
+        self._avg_length = (sum(self._lengths) / len(pages)) if pages else 0.0
+        self._doc_freqs: Counter = Counter()
+        for tf in self._term_freqs:
+            self._doc_freqs.update(tf.keys())
+
+    def _idf(self, term: str) -> float:
+        df = self._doc_freqs.get(term, 0)
+        return math.log(1 + (len(self.pages) - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str) -> List[Tuple[int, float]]:
+        """
+        Score every page against a query.
+
+        Args:
+            query: Query text
+
+        Returns:
+            (page position, score) for pages with a positive score, best first
+        """
+        terms = set(tokenize(query))
+        scores = []
+        for position, tf in enumerate(self._term_freqs):
+            norm = BM25_K1 * (
+                1 - BM25_B + BM25_B * self._lengths[position] / (self._avg_length or 1)
+            )
+            score = 0.0
+            for term in terms:
+                freq = tf.get(term, 0)
+                if freq:
+                    score += self._idf(term) * freq * (BM25_K1 + 1) / (freq + norm)
+            if score > 0:
+                scores.append((position, score))
+        return sorted(scores, key=lambda s: s[1], reverse=True)
+
+    def select_pages(
+        self,
+        query: str,
+        top_k: int = PAGE_RETRIEVAL_TOP_K,
+        neighbors: int = PAGE_RETRIEVAL_NEIGHBORS,
+        min_coverage: float = PAGE_RETRIEVAL_MIN_COVERAGE,
+    ) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, Any]]:
+        """
+        Select the pages relevant to a query.
+
+        Args:
+            query: Query text (check name and description)
+            top_k: Number of best matching pages to select
+            neighbors: Adjacent pages included around each selected page
+            min_coverage: Minimum share of the IDF weight of the query terms
+                found in the document that the selected pages must contain
+
+        Returns:
+            Tuple of (selected pages in document order, or None to use the
+            whole document; retrieval details for reviewMeta)
+        """
+        meta: Dict[str, Any] = {"pages_total": len(self.pages)}
+        if len(self.pages) < PAGE_RETRIEVAL_MIN_PAGES:
+            return None, {**meta, "fallback": "short_document"}
+
+        terms = set(tokenize(query))
+        present = {t for t in terms if self._doc_freqs.get(t)}
+        ranked = self.search(query)
+        if not present or not ranked:
+            return None, {**meta, "fallback": "no_match"}
+
+        positions = set()
+        for position, _ in ranked[:top_k]:
+            for p in range(position - neighbors, position + neighbors + 1):
+                if 0 <= p < len(self.pages):
+                    positions.add(p)
+
+        covered = set()
+        for position in positions:
+            covered.update(t for t in present if t in self._term_freqs[position])
+        coverage = sum(self._idf(t) for t in covered) / sum(
+            self._idf(t) for t in present
+        )
+        meta["coverage"] = round(coverage, 3)
+        if coverage < min_coverage:
+            return None, {**meta, "fallback": "low_coverage"}
+
+        selected = [self.pages[p] for p in sorted(positions)]
+        meta["pages_selected"] = [page["page"] for page in selected]
+        return selected, meta
+
+
+_index_cache: "OrderedDict[str, PageIndex]" = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def get_page_index(artifact_key: str, pages: List[Dict[str, Any]]) -> PageIndex:
+    """
+    Get the page index of a document version, building it on first use.
+
+    Args:
+        artifact_key: Identity of the document version (text artifact key)
+        pages: Pages of the document text artifact
+
+    Returns:
+        PageIndex shared by every check of the document
+    """
+    with _index_cache_lock:
+        index = _index_cache.get(artifact_key)
+        if index is not None:
+            _index_cache.move_to_end(artifact_key)
+            return index
+
+    index = PageIndex(pages)
+    with _index_cache_lock:
+        _index_cache[artifact_key] = index
+        while len(_index_cache) > PAGE_INDEX_CACHE_ENTRIES:
+            _index_cache.popitem(last=False)
+    logger.debug(f"[PageIndex] Built index of {len(pages)} pages for {artifact_key}")
+    return index
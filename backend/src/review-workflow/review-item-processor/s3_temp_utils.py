@@ -1,15 +1,16 @@
 import json
-import boto3
 import uuid
 from datetime import datetime, timedelta
 from typing import Any, Union
 
+from clients import get_boto3_client
+
 class S3TempStorage:
     def __init__(self, bucket_name: str, key_prefix: str = "temp/", ttl_hours: int = 24):
         self.bucket_name = bucket_name
         self.key_prefix = key_prefix
         self.ttl_hours = ttl_hours
-        self.s3_client = boto3.client("s3")
+        self.s3_client = get_boto3_client("s3")
     
     def store(self, payload: Any) -> dict:
         """
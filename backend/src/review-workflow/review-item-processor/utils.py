@@ -3,6 +3,7 @@ Utility functions for the review item processor
 """
 
 import json
+import shutil
 from typing import Any, Dict, List, Optional
 
 
@@ -155,6 +156,33 @@ def ensure_result_fields(result: Dict[str, Any]) -> Dict[str, Any]:
     return result
 
 
+def tmp_cache_budget(
+    share: float, size_limit: Optional[str] = None, path: str = "/tmp"
+) -> int:
+    """
+    Byte budget of a cache under /tmp.
+
+    The /tmp caches (document_cache, image_normalizer, document_text) each
+    take a share of the ephemeral storage instead of a fixed size. Their
+    default shares add up to 60%, which leaves room for the per-review
+    working directories whatever ephemeralStorageSize is configured.
+
+    Args:
+        share: Share of the file system holding path (0-1)
+        size_limit: Explicit budget in bytes (environment value), if set
+        path: Directory whose file system is shared
+
+    Returns:
+        Budget in bytes; 0 disables the cache
+    """
+    if size_limit:
+        return int(size_limit)
+    try:
+        return int(shutil.disk_usage(path).total * share)
+    except OSError:
+        return 0
+
+
 def check_environment_variables() -> List[str]:
     """
     Check required environment variables.
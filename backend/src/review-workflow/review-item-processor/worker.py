@@ -0,0 +1,267 @@
+"""
+Long-running worker that pulls review item events from a queue.
+
+`index.handler` runs one review item per Lambda invocation. For large jobs the
+processor can instead run as a long-lived process (Fargate, EC2, a developer
+machine) that consumes the same events from an SQS queue and reviews several
+of them concurrently. Every review in the process shares the module-level
+clients and caches (boto3 clients, BedrockModel, document cache, MCP tool
+catalogs and results), and results are written through S3TempStorage exactly
+as the Lambda handler does.
+
+Message body: the Lambda event of `index.handler` (single check or "checks"
+batch), optionally with a Step Functions "taskToken". When a task token is
+present the handler output is reported with SendTaskSuccess (or
+SendTaskFailure), so the worker can back a `.waitForTaskToken` task.
+
+While a review runs, the visibility timeout of its message is extended every
+half WORKER_VISIBILITY_TIMEOUT_SECONDS, so a long review is never handed to a
+second worker. A message is deleted once it has been handled; a failed review
+(an exception, or a {"status": "error"} output) without a task token is left
+on the queue and becomes visible again for a retry (or the dead-letter queue).
+
+Usage:
+    WORKER_QUEUE_URL=https://sqs... python worker.py
+"""
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import signal
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from clients import get_boto3_client
+from index import handler
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+WORKER_QUEUE_URL = os.environ.get("WORKER_QUEUE_URL", "")
+# Number of review items processed at the same time
+WORKER_CONCURRENCY = int(os.environ.get("WORKER_CONCURRENCY", "4"))
+# SQS long polling wait time
+WORKER_WAIT_TIME_SECONDS = int(os.environ.get("WORKER_WAIT_TIME_SECONDS", "20"))
+# Visibility timeout of received messages; extended while the review runs
+WORKER_VISIBILITY_TIMEOUT_SECONDS = int(
+    os.environ.get("WORKER_VISIBILITY_TIMEOUT_SECONDS", "300")
+)
+
+# SQS returns at most 10 messages per ReceiveMessage call
+SQS_MAX_MESSAGES = 10
+
+
+class ReviewFailed(Exception):
+    """The handler returned an error output instead of raising."""
+
+
+class SqsQueue:
+    """Review item queue backed by Amazon SQS."""
+
+    def __init__(
+        self,
+        queue_url: str,
+        wait_time_seconds: int = WORKER_WAIT_TIME_SECONDS,
+        visibility_timeout: int = WORKER_VISIBILITY_TIMEOUT_SECONDS,
+    ):
+        if visibility_timeout <= 0:
+            raise ValueError("WORKER_VISIBILITY_TIMEOUT_SECONDS must be positive")
+        self.queue_url = queue_url
+        self.wait_time_seconds = wait_time_seconds
+        self.visibility_timeout = visibility_timeout
+        self.sqs_client = get_boto3_client("sqs")
+
+    def receive(self, max_messages: int) -> List[Dict[str, Any]]:
+        """
+        Long-poll for messages.
+
+        Args:
+            max_messages: Maximum number of messages to return
+
+        Returns:
+            Messages as {"id", "receipt_handle", "body"}
+        """
+        params: Dict[str, Any] = {
+            "QueueUrl": self.queue_url,
+            "MaxNumberOfMessages": max(1, min(max_messages, SQS_MAX_MESSAGES)),
+            "WaitTimeSeconds": self.wait_time_seconds,
+            "VisibilityTimeout": self.visibility_timeout,
+        }
+        response = self.sqs_client.receive_message(**params)
+        return [
+            {
+                "id": m["MessageId"],
+                "receipt_handle": m["ReceiptHandle"],
+                "body": m["Body"],
+            }
+            for m in response.get("Messages", [])
+        ]
+
+    def extend(self, message: Dict[str, Any]) -> None:
+        """Keep a message in progress hidden for another visibility timeout."""
+        self.sqs_client.change_message_visibility(
+            QueueUrl=self.queue_url,
+            ReceiptHandle=message["receipt_handle"],
+            VisibilityTimeout=self.visibility_timeout,
+        )
+
+    def delete(self, message: Dict[str, Any]) -> None:
+        """Delete a handled message."""
+        self.sqs_client.delete_message(
+            QueueUrl=self.queue_url, ReceiptHandle=message["receipt_handle"]
+        )
+
+
+class LocalQueue:
+    """In-process stand-in for SqsQueue (local runs and tests)."""
+
+    def __init__(self, wait_time_seconds: float = 0.1, visibility_timeout: float = 60):
+        self.wait_time_seconds = wait_time_seconds
+        self.visibility_timeout = visibility_timeout
+        self.deleted: List[Dict[str, Any]] = []
+        self._messages: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+
+    def put(self, event: Dict[str, Any]) -> None:
+        """Enqueue a review item event."""
+        message_id = str(uuid.uuid4())
+        self._messages.put(
+            {"id": message_id, "receipt_handle": message_id, "body": json.dumps(event)}
+        )
+
+    def receive(self, max_messages: int) -> List[Dict[str, Any]]:
+        """Return up to max_messages messages, waiting briefly for the first."""
+        messages = []
+        try:
+            messages.append(self._messages.get(timeout=self.wait_time_seconds))
+            while len(messages) < max_messages:
+                messages.append(self._messages.get_nowait())
+        except queue.Empty:
+            pass
+        return messages
+
+    def extend(self, message: Dict[str, Any]) -> None:
+        """Messages of a local queue never become visible again."""
+
+    def delete(self, message: Dict[str, Any]) -> None:
+        """Record a handled message."""
+        self.deleted.append(message)
+
+
+class ReviewWorker:
+    """Processes review item events from a queue with bounded concurrency."""
+
+    def __init__(self, review_queue: Any, concurrency: int = WORKER_CONCURRENCY):
+        self.queue = review_queue
+        self.concurrency = max(1, concurrency)
+        self._stop = asyncio.Event()
+
+    def stop(self) -> None:
+        """Stop receiving; reviews in flight are completed."""
+        self._stop.set()
+
+    async def run(self, drain: bool = False) -> None:
+        """
+        Receive and process messages until stop() is called.
+
+        Args:
+            drain: Return as soon as the queue is empty and nothing is in
+                flight (for LocalQueue and batch-style runs)
+        """
+        loop = asyncio.get_running_loop()
+        # One thread per review plus one for receiving
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.concurrency + 1))
+        in_flight: set = set()
+
+        logger.info(f"Review worker started (concurrency={self.concurrency})")
+        while not self._stop.is_set():
+            free = self.concurrency - len(in_flight)
+            if free == 0:
+                await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            messages = await asyncio.to_thread(self.queue.receive, free)
+            if not messages and drain and not in_flight:
+                break
+
+            for message in messages:
+                task = asyncio.create_task(self._handle(message))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+        if in_flight:
+            logger.info(f"Waiting for {len(in_flight)} review(s) in flight")
+            await asyncio.wait(in_flight)
+        logger.info("Review worker stopped")
+
+    async def _handle(self, message: Dict[str, Any]) -> None:
+        """Process one message and acknowledge it when done."""
+        try:
+            event = json.loads(message["body"])
+        except Exception as e:
+            logger.error(f"Dropping malformed message {message['id']}: {e}")
+            await asyncio.to_thread(self.queue.delete, message)
+            return
+
+        task_token = event.pop("taskToken", None)
+        heartbeat = asyncio.create_task(self._keep_hidden(message))
+        try:
+            output = await asyncio.to_thread(handler, event, None)
+            if isinstance(output, dict) and output.get("status") == "error":
+                raise ReviewFailed(output.get("message", "Review item failed"))
+        except Exception as e:
+            logger.exception(f"Review item in message {message['id']} failed: {e}")
+            if task_token:
+                # Step Functions owns retries of token tasks
+                await asyncio.to_thread(
+                    get_boto3_client("stepfunctions").send_task_failure,
+                    taskToken=task_token,
+                    error=type(e).__name__,
+                    cause=str(e)[:32768],
+                )
+                await asyncio.to_thread(self.queue.delete, message)
+            return
+        finally:
+            heartbeat.cancel()
+
+        if task_token:
+            await asyncio.to_thread(
+                get_boto3_client("stepfunctions").send_task_success,
+                taskToken=task_token,
+                output=json.dumps(output, ensure_ascii=False),
+            )
+        await asyncio.to_thread(self.queue.delete, message)
+        logger.info(f"Review item in message {message['id']} completed")
+
+    async def _keep_hidden(self, message: Dict[str, Any]) -> None:
+        """Extend the visibility of a message until cancelled."""
+        interval = max(1, self.queue.visibility_timeout / 2)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.queue.extend, message)
+            except Exception as e:
+                logger.warning(f"Cannot extend visibility of message {message['id']}: {e}")
+
+
+def main(queue_url: Optional[str] = None) -> None:
+    """Run a worker against WORKER_QUEUE_URL until SIGTERM/SIGINT."""
+    logging.basicConfig(level=logging.INFO)
+    queue_url = queue_url or WORKER_QUEUE_URL
+    if not queue_url:
+        raise ValueError("WORKER_QUEUE_URL is not set")
+
+    async def run() -> None:
+        worker = ReviewWorker(SqsQueue(queue_url))
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, worker.stop)
+        await worker.run()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
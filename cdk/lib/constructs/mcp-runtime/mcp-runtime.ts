@@ -58,7 +58,7 @@ export class McpRuntime extends Construct {
           command: [
             "bash",
             "-c",
-            "pip install -r requirements-locked.txt -t /asset-output && cp -r . /asset-output/",
+            "pip install -r requirements-locked.txt -t /asset-output && cp -r . /asset-output/ && python resolve_uv_tools.py /asset-output/uv-tools.lock.json",
           ],
         },
       }
@@ -1,17 +1,18 @@
 import json
 import logging
 import os
-import shutil
 import sys
 from pathlib import Path
 from typing import List, Mapping, Optional, Sequence
 
-import anyio
 from mcp.client.stdio import StdioServerParameters
 
 # Ref: https://github.com/awslabs/run-model-context-protocol-servers-with-aws-lambda
 from mcp_lambda.server_adapter.adapter import stdio_server_adapter
 from pydantic import BaseModel, Field, model_validator
+from server_pool import server_key, server_pool
+from uv_cache_manager import UvCacheManager, tool_key_from_args
+from uv_prewarm import pin_args, start_prewarm, wait_for_prewarm
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -66,20 +67,26 @@ FIXED_ENV = {
 SIZE_LIMIT = 400 * 1024 * 1024  # 400 MB
 
 
-async def maybe_prune_uv():
+def ensure_fixed_dirs():
     """
-    Prune the uv cache if it exceeds the size limit.
+    Ensure the directories in FIXED_ENV exist.
     """
-    used = (
-        shutil.disk_usage(FIXED_ENV["UV_CACHE_DIR"]).used
-        if os.path.isdir(FIXED_ENV["UV_CACHE_DIR"])
-        else 0
-    )
-    if used >= SIZE_LIMIT:
-        logger.info(
-            f"[uv] cache {used/1e6:.1f}MB exceeds limit {SIZE_LIMIT/1e6:.1f}MB, pruning..."
-        )
-        await anyio.open_process(["/var/task/bin/uv", "cache", "prune", "--ci"])
+    for d in FIXED_ENV.values():
+        Path(d).mkdir(parents=True, exist_ok=True)
+
+
+# Keeps the uv directories under SIZE_LIMIT (see uv_cache_manager.py)
+ensure_fixed_dirs()
+cache_manager = UvCacheManager({**os.environ, **FIXED_ENV}, SIZE_LIMIT)
+
+# Install pinned tool environments during the Lambda init phase (see uv_prewarm.py)
+start_prewarm(
+    {**os.environ, **FIXED_ENV}, on_installed=cache_manager.schedule_evaluation
+)
+
+# Keep stdio servers alive across warm invocations (see server_pool.py).
+# Set to "false" to spawn a fresh server for every message instead.
+SERVER_POOL_ENABLED = os.environ.get("MCP_SERVER_POOL_ENABLED", "true").lower() == "true"
 
 
 class McpServerSpec(BaseModel):
@@ -125,9 +132,7 @@ def build_stdio_server_params(spec: Optional[McpServerSpec]) -> StdioServerParam
     Convert a validated McpServerSpec (or None) into StdioServerParameters.
     """
 
-    for d in FIXED_ENV.values():
-        # Ensure the directories exist
-        Path(d).mkdir(parents=True, exist_ok=True)
+    ensure_fixed_dirs()
 
     # Defaults when the caller omits mcpServer completely
     command = spec.command if spec and spec.command else "uvx"
@@ -136,6 +141,10 @@ def build_stdio_server_params(spec: Optional[McpServerSpec]) -> StdioServerParam
         if spec and spec.args
         else ["awslabs.aws-documentation-mcp-server@latest"]
     )
+    # Serve prewarmed packages from their installed environment instead of
+    # resolving @latest again
+    wait_for_prewarm(args)
+    args = pin_args(args, FIXED_ENV["UV_TOOL_DIR"])
 
     merged_env = {**os.environ, **FIXED_ENV}
     if spec and spec.env:
@@ -204,19 +213,37 @@ def handler(event, context):
     Lambda handler function that uses MCP server adapter for a time server
 
     Args:
-        event: Lambda event containing the request
+        event: Lambda event containing the request, or a JSON-RPC batch
+            (list of requests and notifications)
         context: Lambda execution context
 
     Returns:
-        MCP server response
+        MCP server response, or a list of responses for a batch (notifications
+        produce no entry)
     """
-    # Ensure the uv cache is pruned if necessary
-    anyio.run(maybe_prune_uv)
-
     logger.debug(
         "Received event JSON:\n%s", json.dumps(event, ensure_ascii=False, indent=2)
     )
 
+    if isinstance(event, list):
+        logger.info("Handling JSON-RPC batch of %d messages", len(event))
+        responses = [handle_message(message, context) for message in event]
+        return [response for response in responses if response]
+
+    return handle_message(event, context)
+
+
+def handle_message(event, context):
+    """
+    Answer a single JSON-RPC message
+
+    Args:
+        event: JSON-RPC request or notification, with optional mcpServer
+        context: Lambda execution context
+
+    Returns:
+        MCP server response
+    """
     # Special handling for initialize requests
     if event.get("method") == "initialize" and "params" in event:
         logger.info("Handling initialize request")
@@ -245,8 +272,18 @@ def handler(event, context):
 
     logger.info("Building server parameters from spec: %s", spec)
     server_params = build_stdio_server_params(spec)
-
-    # Pass through all other requests to the adapter
-    response = stdio_server_adapter(server_params, event, context)
+    # Only a tool not seen before can have grown the uv directories
+    new_tool = cache_manager.record_use(tool_key_from_args(server_params.args))
+
+    if SERVER_POOL_ENABLED:
+        # Forward to a warm server process for this spec
+        key = server_key(spec.model_dump(exclude_none=True) if spec else None)
+        response = server_pool.handle(key, server_params, event, context)
+    else:
+        # Pass through all other requests to the adapter
+        response = stdio_server_adapter(server_params, event, context)
     logger.debug("Response JSON:\n%s", json.dumps(response, ensure_ascii=False, indent=2))
+
+    if new_tool:
+        cache_manager.schedule_evaluation()
     return response
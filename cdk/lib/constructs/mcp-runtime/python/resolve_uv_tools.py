@@ -0,0 +1,49 @@
+"""
+Pin the prewarm packages at build time.
+
+Run during bundling (see mcp-runtime.ts). Resolves every package in
+MCP_PREWARM_PACKAGES that has no explicit version to its current release on
+PyPI and writes uv-tools.lock.json, which uv_prewarm.prewarm() installs from.
+
+Usage:
+    python resolve_uv_tools.py [output path]
+"""
+
+import json
+import sys
+import urllib.request
+from typing import Dict
+
+from uv_prewarm import (
+    BUNDLED_LOCKFILE,
+    PREWARM_PACKAGES,
+    normalize_package_name,
+    split_package_spec,
+)
+
+PYPI_JSON_URL = "https://pypi.org/pypi/{name}/json"
+
+
+def latest_version(name: str) -> str:
+    """Current release of a package on PyPI."""
+    with urllib.request.urlopen(PYPI_JSON_URL.format(name=name), timeout=30) as response:
+        return json.load(response)["info"]["version"]
+
+
+def resolve(packages=PREWARM_PACKAGES) -> Dict[str, str]:
+    """Pinned {normalized name: version} of the prewarm packages."""
+    pins = {}
+    for spec in packages:
+        name, version = split_package_spec(spec)
+        if version in (None, "latest"):
+            version = latest_version(name)
+        pins[normalize_package_name(name)] = version
+    return pins
+
+
+if __name__ == "__main__":
+    output = sys.argv[1] if len(sys.argv) > 1 else BUNDLED_LOCKFILE
+    pins = resolve()
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(pins, f, indent=2, sort_keys=True)
+    print(f"Pinned prewarm packages in {output}: {pins}")
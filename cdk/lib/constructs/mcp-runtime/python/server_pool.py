@@ -0,0 +1,357 @@
+"""
+Pool of long-lived stdio MCP server processes.
+
+`stdio_server_adapter` spawns the server process, performs the MCP handshake,
+forwards a single request and tears everything down again, so every JSON-RPC
+message pays process spawn and interpreter start-up. This module instead keeps
+one initialized server per validated `McpServerSpec` alive for as long as the
+Lambda execution environment stays warm.
+
+The sessions live on an asyncio event loop running in a daemon thread. Lambda
+freezes that thread between invocations together with the child processes, and
+thaws both on the next invocation. A pooled server is
+
+  ▸ health-checked with an MCP `ping` when it has been idle for a while,
+  ▸ recycled (closed and re-spawned) when its process dies or a request fails
+    with a transport error,
+  ▸ closed after an idle timeout, and evicted least-recently-used first when
+    the pool is full.
+
+Startup and request timeouts are capped by the time the invocation has left
+(context.get_remaining_time_in_millis() minus a safety margin), so a slow
+server produces a JSON-RPC error instead of a Lambda timeout.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from copy import deepcopy
+from typing import Any, Dict, Optional
+
+import mcp.types as types
+from mcp.client.session import ClientSession
+from mcp.client.stdio import StdioServerParameters, stdio_client
+from mcp.shared.exceptions import McpError
+from pydantic import ValidationError
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# Maximum number of server processes kept alive at the same time
+POOL_MAX_SIZE = int(os.environ.get("MCP_SERVER_POOL_MAX_SIZE", "4"))
+# Servers unused for this long are shut down
+IDLE_TIMEOUT_SECONDS = float(os.environ.get("MCP_SERVER_IDLE_TIMEOUT_SECONDS", "600"))
+# Servers idle for longer than this are pinged before being reused
+HEALTHCHECK_INTERVAL_SECONDS = float(
+    os.environ.get("MCP_SERVER_HEALTHCHECK_INTERVAL_SECONDS", "60")
+)
+# Upper bound for spawning a server and completing the MCP handshake
+STARTUP_TIMEOUT_SECONDS = float(
+    os.environ.get("MCP_SERVER_STARTUP_TIMEOUT_SECONDS", "45")
+)
+# Upper bound for a single request
+REQUEST_TIMEOUT_SECONDS = float(
+    os.environ.get("MCP_SERVER_REQUEST_TIMEOUT_SECONDS", "55")
+)
+# Time kept free before the Lambda timeout to return an error response;
+# the two bounds above are reduced to fit the remaining invocation time
+DEADLINE_MARGIN_SECONDS = float(
+    os.environ.get("MCP_SERVER_DEADLINE_MARGIN_SECONDS", "3")
+)
+HEALTHCHECK_TIMEOUT_SECONDS = 5.0
+
+
+class DeadlineExceeded(Exception):
+    """The invocation has no time left for the next step."""
+
+
+def time_left(deadline: Optional[float], limit: float) -> float:
+    """
+    Timeout for the next step.
+
+    Args:
+        deadline: time.monotonic() by which a response must be ready, or
+            None when there is no invocation deadline
+        limit: Configured upper bound of the step
+
+    Returns:
+        The smaller of limit and the time until the deadline
+    """
+    if deadline is None:
+        return limit
+    left = min(limit, deadline - time.monotonic())
+    if left <= 0:
+        raise DeadlineExceeded("invocation deadline reached")
+    return left
+
+
+class PooledServer:
+    """A running stdio MCP server with an initialized client session."""
+
+    def __init__(self, key: str, server_params: StdioServerParameters):
+        self.key = key
+        self.server_params = server_params
+        self.last_used = time.monotonic()
+        self._session: Optional[ClientSession] = None
+        self._ready: Optional[asyncio.Future] = None
+        self._close_event: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def alive(self) -> bool:
+        """Whether the session task (and therefore the process) is still running."""
+        return self._task is not None and not self._task.done()
+
+    async def start(self, deadline: Optional[float] = None) -> None:
+        """Spawn the process and perform the MCP handshake."""
+        timeout = time_left(deadline, STARTUP_TIMEOUT_SECONDS)
+        loop = asyncio.get_running_loop()
+        self._ready = loop.create_future()
+        self._close_event = asyncio.Event()
+        self._task = loop.create_task(self._run())
+        await asyncio.wait_for(asyncio.shield(self._ready), timeout)
+
+    async def _run(self) -> None:
+        """Own the stdio transport and session until close() is called."""
+        try:
+            async with stdio_client(self.server_params) as streams:
+                async with ClientSession(*streams) as session:
+                    await session.initialize()
+                    self._session = session
+                    self._ready.set_result(None)
+                    await self._close_event.wait()
+        except Exception as e:
+            if not self._ready.done():
+                self._ready.set_exception(e)
+            else:
+                logger.warning("[pool] server %s exited: %s", self.key, e)
+        finally:
+            self._session = None
+
+    async def ping(self, deadline: Optional[float] = None) -> None:
+        """MCP health check."""
+        await asyncio.wait_for(
+            self._session.send_ping(), time_left(deadline, HEALTHCHECK_TIMEOUT_SECONDS)
+        )
+
+    async def request(
+        self, request: Dict[str, Any], deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Forward a JSON-RPC request body (without jsonrpc/id) and return its result."""
+        timeout = time_left(deadline, REQUEST_TIMEOUT_SECONDS)
+        self.last_used = time.monotonic()
+        result = await asyncio.wait_for(
+            self._session.send_request(
+                request=types.ClientRequest(request),
+                result_type=types.Result,
+            ),
+            timeout,
+        )
+        self.last_used = time.monotonic()
+        return result.model_dump(by_alias=True, mode="json", exclude_none=True)
+
+    async def close(self) -> None:
+        """Shut the session down and terminate the process."""
+        if self._close_event is not None:
+            self._close_event.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, HEALTHCHECK_TIMEOUT_SECONDS)
+            except Exception:
+                self._task.cancel()
+
+
+class StdioServerPool:
+    """Keeps stdio MCP servers alive across warm Lambda invocations."""
+
+    def __init__(self, max_size: int = POOL_MAX_SIZE):
+        self.max_size = max_size
+        self._servers: "OrderedDict[str, PooledServer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the background event loop on first use."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._loop.run_forever, name="mcp-server-pool", daemon=True
+            )
+            self._thread.start()
+        return self._loop
+
+    def handle(
+        self,
+        key: str,
+        server_params: StdioServerParameters,
+        event: Dict[str, Any],
+        context: Any = None,
+    ) -> Dict[str, Any]:
+        """
+        Answer a JSON-RPC message using the pooled server for `key`.
+
+        Args:
+            key: Identity of the server (see server_key)
+            server_params: Parameters used when the server must be (re)started
+            event: JSON-RPC request or notification
+            context: Lambda execution context; its remaining time bounds the
+                startup and request timeouts
+
+        Returns:
+            JSON-RPC response, or {} for notifications (same contract as
+            stdio_server_adapter)
+        """
+        deadline = None
+        if context is not None:
+            deadline = (
+                time.monotonic()
+                + context.get_remaining_time_in_millis() / 1000
+                - DEADLINE_MARGIN_SECONDS
+            )
+        with self._lock:
+            loop = self._ensure_loop()
+            future = asyncio.run_coroutine_threadsafe(
+                self._handle(key, server_params, event, deadline), loop
+            )
+            return future.result()
+
+    async def _handle(
+        self,
+        key: str,
+        server_params: StdioServerParameters,
+        event: Dict[str, Any],
+        deadline: Optional[float],
+    ) -> Dict[str, Any]:
+        await self._sweep_idle()
+
+        message = {k: v for k, v in event.items() if k != "mcpServer"}
+        try:
+            types.JSONRPCRequest.model_validate(message)
+        except ValidationError:
+            try:
+                types.JSONRPCNotification.model_validate(message)
+                # Notifications are not forwarded (stateless contract)
+                logger.debug("[pool] ignoring notification %s", message.get("method"))
+                return {}
+            except ValidationError:
+                return types.JSONRPCError(
+                    jsonrpc=message.get("jsonrpc", "2.0"),
+                    id=message.get("id", 0),
+                    error=types.ErrorData(
+                        code=400,
+                        message="Request is neither a valid JSON-RPC request nor a valid JSON-RPC notification",
+                    ),
+                ).model_dump(by_alias=True, mode="json", exclude_none=True)
+
+        request = deepcopy(message)
+        jsonrpc = request.pop("jsonrpc", "2.0")
+        request_id = request.pop("id", None)
+
+        # One retry on a freshly spawned server if the pooled one turned out dead
+        for attempt in range(2):
+            try:
+                server = await self._acquire(key, server_params, deadline)
+                result = await server.request(request, deadline)
+                return types.JSONRPCResponse(
+                    jsonrpc=jsonrpc, id=request_id, result=result
+                ).model_dump(by_alias=True, mode="json", exclude_none=True)
+            except McpError as e:
+                # The server answered with a JSON-RPC error; it is healthy
+                return types.JSONRPCError(
+                    jsonrpc=jsonrpc, id=request_id, error=e.error
+                ).model_dump(by_alias=True, mode="json", exclude_none=True)
+            except DeadlineExceeded:
+                logger.error("[pool] no time left for a request to %s", key)
+                break
+            except Exception as e:
+                logger.error(
+                    "[pool] request to %s failed (attempt %d): %s",
+                    key,
+                    attempt + 1,
+                    e,
+                    exc_info=True,
+                )
+                await self._discard(key)
+
+        return types.JSONRPCError(
+            jsonrpc=jsonrpc,
+            id=request_id,
+            error=types.ErrorData(
+                code=500,
+                message="Internal failure, please check Lambda function logs",
+            ),
+        ).model_dump(by_alias=True, mode="json", exclude_none=True)
+
+    async def _acquire(
+        self,
+        key: str,
+        server_params: StdioServerParameters,
+        deadline: Optional[float] = None,
+    ) -> PooledServer:
+        """Get a healthy server for `key`, spawning one if needed."""
+        server = self._servers.get(key)
+        if server is not None:
+            healthy = server.alive
+            idle = time.monotonic() - server.last_used
+            if healthy and idle > HEALTHCHECK_INTERVAL_SECONDS:
+                try:
+                    await server.ping(deadline)
+                except DeadlineExceeded:
+                    raise
+                except Exception as e:
+                    logger.warning("[pool] health check of %s failed: %s", key, e)
+                    healthy = False
+            if healthy:
+                self._servers.move_to_end(key)
+                logger.info("[pool] reusing warm server %s", key)
+                return server
+            await self._discard(key)
+
+        while len(self._servers) >= self.max_size:
+            lru_key = next(iter(self._servers))
+            logger.info("[pool] pool full, evicting %s", lru_key)
+            await self._discard(lru_key)
+
+        logger.info("[pool] starting server %s", key)
+        server = PooledServer(key, server_params)
+        try:
+            await server.start(deadline)
+        except BaseException:
+            await server.close()
+            raise
+        self._servers[key] = server
+        return server
+
+    async def _discard(self, key: str) -> None:
+        """Close and forget the server for `key`."""
+        server = self._servers.pop(key, None)
+        if server is not None:
+            logger.info("[pool] closing server %s", key)
+            await server.close()
+
+    async def _sweep_idle(self) -> None:
+        """Close servers that have not been used within the idle timeout."""
+        now = time.monotonic()
+        for key, server in list(self._servers.items()):
+            if not server.alive or now - server.last_used > IDLE_TIMEOUT_SECONDS:
+                await self._discard(key)
+
+
+def server_key(spec_json: Optional[Dict[str, Any]]) -> str:
+    """
+    Stable identity of a validated mcpServer specification.
+
+    Hashed so that secrets passed through `env` never show up in logs.
+    """
+    payload = json.dumps(spec_json or {}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+# Module level so that it survives across warm invocations
+server_pool = StdioServerPool()
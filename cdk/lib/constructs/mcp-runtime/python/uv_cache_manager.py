@@ -0,0 +1,159 @@
+"""
+Incremental manager for the uv cache and tool environments under /tmp.
+
+/tmp is limited ephemeral storage and uv never prunes its cache by itself
+(astral-sh/uv#5731). Instead of checking disk usage on every invocation, this
+manager
+
+  ▸ records which tool each request uses and when (cheap, in memory),
+  ▸ re-evaluates the size of the uv directories only when a tool it has not
+    seen before shows up (i.e. something new was installed),
+  ▸ evaluates in a background thread, holding the same lock as the prewarm
+    installer so that pruning never races an install, and
+  ▸ evicts least-recently-used tool environments, then prunes the cache,
+    until usage is back under the target size.
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from typing import Dict, Mapping, Optional
+
+from uv_prewarm import UV_BIN, install_lock, normalize_package_name, split_package_spec
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# Evict down to this fraction of the size limit so evaluation is not re-triggered immediately
+TARGET_RATIO = float(os.environ.get("UV_CACHE_TARGET_RATIO", "0.8"))
+# Tools used more recently than this are never evicted (their server may still be warm)
+MIN_IDLE_SECONDS = float(os.environ.get("UV_CACHE_MIN_IDLE_SECONDS", "600"))
+
+
+def dir_size(path: str) -> int:
+    """Total size in bytes of the files below path."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def tool_key_from_args(args) -> Optional[str]:
+    """Normalized package name of a uvx invocation, if it can be determined."""
+    if not args or args[0].startswith("-"):
+        return None
+    name, _ = split_package_spec(args[0])
+    return normalize_package_name(name)
+
+
+class UvCacheManager:
+    """Tracks tool usage and keeps the uv directories within a size limit."""
+
+    def __init__(self, env: Mapping[str, str], size_limit: int):
+        self.env = dict(env)
+        self.size_limit = size_limit
+        self.cache_dir = env["UV_CACHE_DIR"]
+        self.tool_dir = env["UV_TOOL_DIR"]
+        self.python_dir = env["UV_PYTHON_INSTALL_DIR"]
+        self._last_access: Dict[str, float] = {}
+        self._state_lock = threading.Lock()
+        self._evaluating = False
+
+    def record_use(self, tool_key: Optional[str]) -> bool:
+        """
+        Record that a request used the given tool.
+
+        Returns:
+            True if the tool was not seen before (it may just have been
+            installed), in which case the caller should schedule evaluation
+        """
+        if tool_key is None:
+            return False
+        with self._state_lock:
+            is_new = tool_key not in self._last_access
+            self._last_access[tool_key] = time.time()
+        return is_new
+
+    def schedule_evaluation(self) -> None:
+        """Evaluate usage in a background thread unless one is already running."""
+        with self._state_lock:
+            if self._evaluating:
+                return
+            self._evaluating = True
+        threading.Thread(
+            target=self._evaluate, name="uv-cache-manager", daemon=True
+        ).start()
+
+    def usage(self) -> int:
+        """Bytes used by the uv cache, tool environments and managed Pythons."""
+        return sum(
+            dir_size(d) for d in (self.cache_dir, self.tool_dir, self.python_dir)
+        )
+
+    def _evaluate(self) -> None:
+        try:
+            with install_lock:
+                used = self.usage()
+                logger.info(
+                    f"[uv] usage {used/1e6:.1f}MB (limit {self.size_limit/1e6:.1f}MB)"
+                )
+                if used < self.size_limit:
+                    return
+
+                target = self.size_limit * TARGET_RATIO
+                for tool_key in self._eviction_candidates():
+                    if used <= target:
+                        break
+                    self._uninstall(tool_key)
+                    used = self.usage()
+
+                if used > target:
+                    self._run_uv("cache", "prune", "--ci")
+                    used = self.usage()
+                    logger.info(f"[uv] usage after prune {used/1e6:.1f}MB")
+        except Exception as e:
+            logger.warning(f"[uv] cache evaluation failed: {e}")
+        finally:
+            with self._state_lock:
+                self._evaluating = False
+
+    def _eviction_candidates(self):
+        """Installed tool environments, least recently used first."""
+        try:
+            installed = [
+                normalize_package_name(name)
+                for name in os.listdir(self.tool_dir)
+                if os.path.isdir(os.path.join(self.tool_dir, name))
+            ]
+        except FileNotFoundError:
+            return []
+
+        now = time.time()
+        with self._state_lock:
+            last_access = dict(self._last_access)
+        candidates = [
+            key
+            for key in installed
+            if now - last_access.get(key, 0) > MIN_IDLE_SECONDS
+        ]
+        return sorted(candidates, key=lambda key: last_access.get(key, 0))
+
+    def _uninstall(self, tool_key: str) -> None:
+        logger.info(f"[uv] evicting tool environment {tool_key}")
+        try:
+            self._run_uv("tool", "uninstall", tool_key)
+        except Exception as e:
+            logger.warning(f"[uv] uninstall of {tool_key} failed, removing directory: {e}")
+            shutil.rmtree(os.path.join(self.tool_dir, tool_key), ignore_errors=True)
+        with self._state_lock:
+            self._last_access.pop(tool_key, None)
+
+    def _run_uv(self, *args: str) -> None:
+        subprocess.run([UV_BIN, *args], env=self.env, check=True)
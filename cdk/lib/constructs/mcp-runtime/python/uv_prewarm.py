@@ -0,0 +1,234 @@
+"""
+Pre-resolved uvx tool environments for the Python MCP runtime.
+
+`uvx <package>@latest` resolves the newest release and installs its wheels into
+/tmp the first time a fresh container runs it, which makes the first MCP call
+of every cold start the slowest one. This module moves that work to the
+Lambda init phase:
+
+  ▸ resolve_uv_tools.py runs during bundling and pins the packages listed
+    in MCP_PREWARM_PACKAGES to their current releases in uv-tools.lock.json.
+  ▸ prewarm() installs those packages with `uv tool install` at the pinned
+    versions, and records the installed versions in a lockfile under
+    UV_TOOL_DIR.
+  ▸ pin_args() rewrites `<package>` / `<package>@latest` in uvx arguments to
+    the recorded `<package>@<version>`, which uvx serves from the installed
+    tool environment without resolving anything.
+
+prewarm() runs in a background thread started during init (init has a hard
+time limit). Only requests for a prewarmed package wait for it, through
+wait_for_prewarm(), and only for a bounded time. Doing the
+work before the first invocation also makes the result part of a SnapStart
+snapshot when that is enabled.
+"""
+
+import json
+import logging
+import os
+import re
+import subprocess
+import threading
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+UV_BIN = "/var/task/bin/uv"
+
+DEFAULT_PREWARM_PACKAGES = "awslabs.aws-documentation-mcp-server"
+PREWARM_ENABLED = os.environ.get("MCP_PREWARM_ENABLED", "true").lower() == "true"
+PREWARM_PACKAGES = [
+    p.strip()
+    for p in os.environ.get("MCP_PREWARM_PACKAGES", DEFAULT_PREWARM_PACKAGES).split(",")
+    if p.strip()
+]
+# How long a request for a prewarmed package waits for an unfinished prewarm
+# before running uvx anyway (well under the function timeout)
+PREWARM_WAIT_SECONDS = float(os.environ.get("MCP_PREWARM_WAIT_SECONDS", "15"))
+
+# Build-time pins written by resolve_uv_tools.py: {"package": "version"}
+BUNDLED_LOCKFILE = os.path.join(os.path.dirname(__file__), "uv-tools.lock.json")
+LOCKFILE_NAME = "rapid-tools.lock.json"
+
+_TOOL_LIST_LINE = re.compile(r"^(\S+) v(\S+)$")
+
+_prewarm_done = threading.Event()
+# Held while tool environments are installed or evicted
+install_lock = threading.Lock()
+
+
+def normalize_package_name(name: str) -> str:
+    """PEP 503 normalized package name."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def split_package_spec(spec: str) -> Tuple[str, Optional[str]]:
+    """Split `name`, `name@version` or `name==version` into (name, version)."""
+    for sep in ("@", "=="):
+        if sep in spec:
+            name, version = spec.split(sep, 1)
+            return name, version
+    return spec, None
+
+
+def _lockfile_path(tool_dir: str) -> str:
+    return os.path.join(tool_dir, LOCKFILE_NAME)
+
+
+def _read_json(path: str) -> Dict[str, str]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return {normalize_package_name(k): v for k, v in json.load(f).items()}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning("[uv] could not read %s: %s", path, e)
+        return {}
+
+
+def read_lockfile(tool_dir: str) -> Dict[str, str]:
+    """Versions of the tools installed by prewarm(), keyed by normalized name."""
+    return _read_json(_lockfile_path(tool_dir))
+
+
+def _write_lockfile(tool_dir: str, versions: Dict[str, str]) -> None:
+    path = _lockfile_path(tool_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(versions, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def installed_tool_versions(env: Mapping[str, str]) -> Dict[str, str]:
+    """Parse `uv tool list` into {normalized name: version}."""
+    completed = subprocess.run(
+        [UV_BIN, "tool", "list"],
+        env=dict(env),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    versions = {}
+    for line in completed.stdout.splitlines():
+        m = _TOOL_LIST_LINE.match(line.strip())
+        if m:
+            versions[normalize_package_name(m.group(1))] = m.group(2)
+    return versions
+
+
+def prewarm(
+    env: Mapping[str, str],
+    packages: Optional[List[str]] = None,
+    on_installed: Optional[Callable[[], None]] = None,
+) -> None:
+    """
+    Install the prewarm packages as uv tools and record their versions.
+
+    Args:
+        env: Environment for uv (must contain the UV_* directories)
+        packages: Package specs to install; defaults to MCP_PREWARM_PACKAGES
+        on_installed: Called after at least one package was installed
+    """
+    installed_any = False
+    packages = PREWARM_PACKAGES if packages is None else packages
+    tool_dir = env["UV_TOOL_DIR"]
+    try:
+        with install_lock:
+            bundled = _read_json(BUNDLED_LOCKFILE)
+            locked = read_lockfile(tool_dir)
+            installed = installed_tool_versions(env)
+
+            for spec in packages:
+                name, version = split_package_spec(spec)
+                key = normalize_package_name(name)
+                if version in (None, "latest"):
+                    version = bundled.get(key)
+
+                if key in installed and (version is None or installed[key] == version):
+                    logger.info("[uv] %s %s already installed", name, installed[key])
+                    continue
+
+                requirement = f"{name}=={version}" if version else name
+                logger.info("[uv] pre-installing %s", requirement)
+                subprocess.run(
+                    [UV_BIN, "tool", "install", "--force", requirement],
+                    env=dict(env),
+                    check=True,
+                )
+                installed_any = True
+
+            installed = installed_tool_versions(env)
+            locked.update(installed)
+            _write_lockfile(tool_dir, locked)
+            logger.info("[uv] prewarmed tools: %s", installed)
+    except Exception as e:
+        logger.warning("[uv] prewarm failed, uvx will resolve on demand: %s", e)
+    finally:
+        _prewarm_done.set()
+
+    if installed_any and on_installed is not None:
+        on_installed()
+
+
+def start_prewarm(
+    env: Mapping[str, str], on_installed: Optional[Callable[[], None]] = None
+) -> None:
+    """Run prewarm() in a background thread (called during Lambda init)."""
+    if not PREWARM_ENABLED or not PREWARM_PACKAGES:
+        _prewarm_done.set()
+        return
+    threading.Thread(
+        target=prewarm,
+        args=(dict(env), None, on_installed),
+        name="uv-prewarm",
+        daemon=True,
+    ).start()
+
+
+def is_prewarm_package(spec: str) -> bool:
+    """Whether a package spec names one of the MCP_PREWARM_PACKAGES."""
+    name = normalize_package_name(split_package_spec(spec)[0])
+    return any(
+        normalize_package_name(split_package_spec(p)[0]) == name
+        for p in PREWARM_PACKAGES
+    )
+
+
+def wait_for_prewarm(args: List[str]) -> None:
+    """
+    Wait for an unfinished prewarm() if it installs the requested package.
+
+    Args:
+        args: uvx arguments, package spec first
+    """
+    if _prewarm_done.is_set() or not args or not is_prewarm_package(args[0]):
+        return
+    if not _prewarm_done.wait(PREWARM_WAIT_SECONDS):
+        logger.warning("[uv] prewarm still running, continuing without it")
+
+
+def pin_args(args: List[str], tool_dir: str) -> List[str]:
+    """
+    Pin the uvx package argument to the version recorded by prewarm().
+
+    Args:
+        args: uvx arguments, package spec first
+        tool_dir: UV_TOOL_DIR holding the lockfile
+
+    Returns:
+        Arguments with `<package>` / `<package>@latest` replaced by
+        `<package>@<locked version>` when the package was prewarmed
+    """
+    if not args or args[0].startswith("-"):
+        return args
+
+    name, version = split_package_spec(args[0])
+    if version not in (None, "latest"):
+        return args
+
+    locked = read_lockfile(tool_dir).get(normalize_package_name(name))
+    if locked is None:
+        return args
+
+    logger.debug("[uv] pinning %s to %s", args[0], locked)
+    return [f"{name}@{locked}", *args[1:]]
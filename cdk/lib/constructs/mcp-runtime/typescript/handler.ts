@@ -137,6 +137,25 @@ function handleInitialize(params: any, id: string | number): any {
 export const handler: Handler = async (event: any, ctx: Context) => {
   log.debug("[handler] event", util.inspect(event, { depth: null }));
 
+  // JSON-RPC batch: answer every message, notifications produce no entry
+  if (Array.isArray(event)) {
+    log.info(`[handler] JSON-RPC batch of ${event.length} messages`);
+    const responses: any[] = [];
+    for (const message of event) {
+      responses.push(await handleMessage(message, ctx));
+    }
+    return responses.filter(
+      (response) => response && Object.keys(response).length > 0
+    );
+  }
+
+  return handleMessage(event, ctx);
+};
+
+/**
+ * Answer a single JSON-RPC message
+ */
+async function handleMessage(event: any, ctx: Context): Promise<any> {
   // Special handling for initialize requests
   if (event.method === "initialize" && event.params) {
     return handleInitialize(event.params, event.id);
@@ -206,4 +225,4 @@ export const handler: Handler = async (event: any, ctx: Context) => {
   // ─────────────────────────────────────────────────────────────
   const { mcpServer: _ignored, ...rpcMessage } = event;
   return stdioServerAdapter(serverParams, rpcMessage, ctx);
-};
+}